@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import base64
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from ecom_custom.benchmarks import payloads
+
+_ORDERS = re.compile(r"/admin/api/[^/]+/orders\.json$")
+_ORDER = re.compile(r"/admin/api/[^/]+/orders/(\d+)\.json$")
+_FULFILLMENT = re.compile(r"/fulfillments/(\d+)\.json$")
+_PRODUCT = re.compile(r"/admin/api/[^/]+/products/(\d+)\.json$")
+_GRAPHQL = re.compile(r"/admin/api/[^/]+/graphql\.json$")
+
+
+class FakeShopify:
+	"""Local stand-in for the Shopify REST/GraphQL endpoints the order pipeline talks to.
+
+	Serves ``order_count`` generated orders with cursor pagination (``Link`` headers and
+	``page_info``), the ``ids=`` filter, single orders, fulfillments and products. Every response
+	carries ``X-Shopify-Shop-Api-Call-Limit`` from a leaky bucket of ``bucket_size`` calls that
+	drains at ``bucket_size / 20`` per second; an overflowing call gets a 429 with ``Retry-After``.
+	"""
+
+	def __init__(self, order_count: int, bucket_size: int = 400, revision: int = 0) -> None:
+		self.order_count = order_count
+		self.bucket_size = bucket_size
+		self.revision = revision
+		self.calls: Counter[str] = Counter()
+		self._used = 0.0
+		self._last_leak = time.monotonic()
+		self._lock = threading.Lock()
+		self._server: ThreadingHTTPServer | None = None
+
+	@property
+	def url(self) -> str:
+		host, port = self._server.server_address[:2]
+		return f"http://{host}:{port}"
+
+	@property
+	def total_calls(self) -> int:
+		return sum(self.calls.values())
+
+	def start(self) -> FakeShopify:
+		fake = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self) -> None:
+				fake._handle(self)
+
+			def do_POST(self) -> None:
+				fake._handle(self)
+
+			def log_message(self, *args) -> None:
+				pass
+
+		self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+		threading.Thread(target=self._server.serve_forever, daemon=True).start()
+		return self
+
+	def stop(self) -> None:
+		if self._server:
+			self._server.shutdown()
+			self._server.server_close()
+			self._server = None
+
+	def __enter__(self) -> FakeShopify:
+		return self.start()
+
+	def __exit__(self, *exc_info) -> None:
+		self.stop()
+
+	def _handle(self, request: BaseHTTPRequestHandler) -> None:
+		parsed = urlparse(request.path)
+		query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+		used = self._take_call()
+		if used is None:
+			self.calls["throttled"] += 1
+			self._respond(request, 429, {"errors": "Exceeded 2 calls per second"}, {"Retry-After": "1.0"})
+			return
+
+		headers = {"X-Shopify-Shop-Api-Call-Limit": f"{math.ceil(used)}/{self.bucket_size}"}
+		path = parsed.path
+
+		if _ORDERS.search(path):
+			self.calls["orders"] += 1
+			body, link = self._orders_page(path, query)
+			if link:
+				headers["Link"] = link
+			self._respond(request, 200, body, headers)
+		elif match := _ORDER.search(path):
+			self.calls["order"] += 1
+			index = payloads.order_index(match.group(1))
+			if 0 <= index < self.order_count:
+				self._respond(request, 200, {"order": self._order(index)}, headers)
+			else:
+				self._respond(request, 404, {"errors": "Not Found"}, headers)
+		elif match := _FULFILLMENT.search(path):
+			self.calls["fulfillment"] += 1
+			index = int(match.group(1)) - payloads.FULFILLMENT_ID_BASE
+			self._respond(request, 200, {"fulfillment": payloads.generate_fulfillment(index)}, headers)
+		elif match := _PRODUCT.search(path):
+			self.calls["product"] += 1
+			self._respond(request, 200, {"product": payloads.generate_product(int(match.group(1)))}, headers)
+		elif _GRAPHQL.search(path):
+			self.calls["graphql"] += 1
+			self._respond(request, 200, self._graphql(request), headers)
+		else:
+			self.calls["unknown"] += 1
+			self._respond(request, 404, {"errors": "Not Found"}, headers)
+
+	def _orders_page(self, path: str, query: dict[str, str]) -> tuple[dict[str, Any], str | None]:
+		limit = min(int(query.get("limit") or 50), 250)
+
+		if query.get("ids"):
+			indexes = [payloads.order_index(value) for value in query["ids"].split(",") if value]
+			orders = [self._order(index) for index in indexes if 0 <= index < self.order_count]
+			return {"orders": orders[:limit]}, None
+
+		if query.get("page_info"):
+			start, end = json.loads(base64.urlsafe_b64decode(query["page_info"]))
+		else:
+			start, end = self._index_range(query)
+
+		page_end = min(start + limit, end)
+		orders = [self._order(index) for index in range(start, page_end)]
+
+		link = None
+		if page_end < end:
+			cursor = base64.urlsafe_b64encode(json.dumps([page_end, end]).encode()).decode()
+			link = f'<{self.url}{path}?{urlencode({"limit": limit, "page_info": cursor})}>; rel="next"'
+		return {"orders": orders}, link
+
+	def _index_range(self, query: dict[str, str]) -> tuple[int, int]:
+		start, end = 0, self.order_count
+		for key in ("created_at_min", "updated_at_min"):
+			if query.get(key):
+				start = max(start, math.ceil(self._offset(query[key])))
+		for key in ("created_at_max", "updated_at_max"):
+			if query.get(key):
+				end = min(end, math.floor(self._offset(query[key])) + 1)
+		return start, max(start, end)
+
+	def _offset(self, value: str) -> float:
+		moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+		if moment.tzinfo is None:
+			moment = moment.replace(tzinfo=payloads.START_DATE.tzinfo)
+		return (moment - payloads.START_DATE) / payloads.ORDER_INTERVAL
+
+	def _order(self, index: int) -> dict[str, Any]:
+		return payloads.generate_order(index, revision=self.revision)
+
+	def _graphql(self, request: BaseHTTPRequestHandler) -> dict[str, Any]:
+		length = int(request.headers.get("Content-Length") or 0)
+		body = json.loads(request.rfile.read(length) or b"{}")
+		ids = (body.get("variables") or {}).get("ids") or []
+
+		nodes = []
+		for gid in ids:
+			legacy_id = int(gid.rsplit("/", 1)[-1])
+			fulfillment = payloads.generate_fulfillment(legacy_id - payloads.FULFILLMENT_ID_BASE)
+			nodes.append(
+				{
+					"legacyResourceId": str(legacy_id),
+					"trackingInfo": [
+						{
+							"company": fulfillment["tracking_company"],
+							"number": fulfillment["tracking_number"],
+							"url": fulfillment["tracking_url"],
+						}
+					],
+				}
+			)
+		return {"data": {"nodes": nodes}}
+
+	def _take_call(self) -> float | None:
+		with self._lock:
+			now = time.monotonic()
+			self._used = max(0.0, self._used - (now - self._last_leak) * self.bucket_size / 20)
+			self._last_leak = now
+			if self._used + 1 > self.bucket_size:
+				return None
+			self._used += 1
+			return self._used
+
+	def _respond(
+		self, request: BaseHTTPRequestHandler, status: int, body: dict[str, Any], headers: dict[str, str]
+	) -> None:
+		data = json.dumps(body).encode()
+		request.send_response(status)
+		request.send_header("Content-Type", "application/json")
+		request.send_header("Content-Length", str(len(data)))
+		for key, value in headers.items():
+			request.send_header(key, value)
+		request.end_headers()
+		request.wfile.write(data)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+# Ids far above anything a real shop hands out, so benchmark documents are easy to tell apart.
+ORDER_ID_BASE = 9_000_000_000_000
+CUSTOMER_ID_BASE = 8_000_000_000_000
+PRODUCT_ID_BASE = 7_000_000_000_000
+VARIANT_ID_BASE = 6_000_000_000_000
+FULFILLMENT_ID_BASE = 5_000_000_000_000
+
+START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ORDER_INTERVAL = timedelta(minutes=5)
+PRODUCT_COUNT = 50
+ORDERS_PER_CUSTOMER = 5
+
+_PROVINCES = (("Milano", "MI"), ("Roma", "RM"), ("Torino", "TO"), ("Napoli", "NA"), ("Bolzano", "BZ"))
+_GATEWAYS = (["shopify_payments"], ["paypal"], ["Contrassegno"], ["manual"])
+_FINANCIAL_STATUSES = ("paid", "paid", "paid", "pending", "partially_refunded")
+
+
+def order_id(index: int) -> int:
+	return ORDER_ID_BASE + index
+
+
+def order_index(shopify_order_id: str | int) -> int:
+	return int(shopify_order_id) - ORDER_ID_BASE
+
+
+def created_at(index: int) -> datetime:
+	return START_DATE + index * ORDER_INTERVAL
+
+
+def generate_order(index: int, revision: int = 0) -> dict[str, Any]:
+	"""Build a deterministic REST-shaped order payload; ``revision`` simulates later edits."""
+
+	rng = random.Random(index)
+	customer_index = index // ORDERS_PER_CUSTOMER
+	province, province_code = _PROVINCES[customer_index % len(_PROVINCES)]
+	created = created_at(index)
+	fulfilled = index % 3 == 0
+
+	address = {
+		"first_name": f"Bench{customer_index}",
+		"last_name": "Customer",
+		"name": f"Bench{customer_index} Customer",
+		"company": None,
+		"address1": f"Via Benchmark {customer_index % 200 + 1}",
+		"address2": None,
+		"city": province,
+		"province": province,
+		"province_code": province_code,
+		"zip": f"{20100 + customer_index % 900}",
+		"country": "Italy",
+		"country_code": "IT",
+		"phone": f"+39 02 {customer_index:07d}",
+	}
+
+	line_items = []
+	for position in range(rng.randint(1, 3)):
+		product = rng.randrange(PRODUCT_COUNT)
+		line_items.append(
+			{
+				"id": order_id(index) * 10 + position,
+				"product_id": PRODUCT_ID_BASE + product,
+				"variant_id": VARIANT_ID_BASE + product,
+				"sku": f"BENCH-{product:03d}",
+				"title": f"Benchmark Product {product}",
+				"name": f"Benchmark Product {product}",
+				"quantity": rng.randint(1, 4),
+				"price": f"{10 + product:.2f}",
+				"taxable": True,
+				"product_exists": True,
+				"tax_lines": [{"title": "IVA", "rate": 0.22, "price": f"{(10 + product) * 0.22:.2f}"}],
+				"discount_allocations": [],
+			}
+		)
+
+	discount_codes = (
+		[{"code": "BENCH10", "amount": "10.00", "type": "fixed_amount"}] if index % 7 == 0 else []
+	)
+
+	return {
+		"id": order_id(index),
+		"admin_graphql_api_id": f"gid://shopify/Order/{order_id(index)}",
+		"name": f"#B{index + 1000}",
+		"email": f"bench{customer_index}@example.com",
+		"created_at": created.isoformat(),
+		"updated_at": (created + timedelta(minutes=revision)).isoformat(),
+		"closed_at": None,
+		"cancel_reason": None,
+		"currency": "EUR",
+		"taxes_included": True,
+		"financial_status": _FINANCIAL_STATUSES[(index + revision) % len(_FINANCIAL_STATUSES)],
+		"fulfillment_status": "fulfilled" if fulfilled else None,
+		"payment_gateway_names": _GATEWAYS[index % len(_GATEWAYS)],
+		"discount_codes": discount_codes,
+		"customer": {
+			"id": CUSTOMER_ID_BASE + customer_index,
+			"first_name": address["first_name"],
+			"last_name": address["last_name"],
+			"email": f"bench{customer_index}@example.com",
+			"phone": address["phone"],
+		},
+		"shipping_address": address,
+		"billing_address": dict(address),
+		"line_items": line_items,
+		"shipping_lines": [{"title": "Standard", "code": "standard", "price": "5.00", "tax_lines": []}],
+		"fulfillments": [generate_fulfillment(index)] if fulfilled else [],
+		"note": f"revision {revision}" if revision else None,
+		"tags": "",
+	}
+
+
+def generate_fulfillment(index: int) -> dict[str, Any]:
+	return {
+		"id": FULFILLMENT_ID_BASE + index,
+		"order_id": order_id(index),
+		"status": "success",
+		"tracking_company": "BRT",
+		"tracking_number": f"BRT{index:010d}",
+		"tracking_numbers": [f"BRT{index:010d}"],
+		"tracking_url": f"https://tracking.example.com/BRT{index:010d}",
+		"tracking_urls": [f"https://tracking.example.com/BRT{index:010d}"],
+		"line_items": [],
+	}
+
+
+def generate_product(product_id: int) -> dict[str, Any]:
+	index = product_id - PRODUCT_ID_BASE
+	return {
+		"id": product_id,
+		"title": f"Benchmark Product {index}",
+		"vendor": "Benchmark",
+		"product_type": "Benchmark",
+		"body_html": "",
+		"options": [{"name": "Title", "values": ["Default Title"]}],
+		"variants": [
+			{
+				"id": VARIANT_ID_BASE + index,
+				"product_id": product_id,
+				"title": "Default Title",
+				"sku": f"BENCH-{index:03d}",
+				"price": f"{10 + index:.2f}",
+				"option1": "Default Title",
+				"option2": None,
+				"option3": None,
+			}
+		],
+		"image": None,
+		"images": [],
+	}
@@ -0,0 +1,214 @@
+"""Throughput benchmark for the Shopify order pipeline.
+
+Run against a throwaway site with a configured, enabled Shopify Setting::
+
+	bench --site bench.localhost execute ecom_custom.benchmarks.run.run --kwargs "{'sizes': [100, 1000]}"
+
+All Shopify traffic goes to :class:`~ecom_custom.benchmarks.fake_shopify.FakeShopify`; the
+documents created (Sales Orders, Customers, Items, logs) stay on the site.
+"""
+
+from __future__ import annotations
+
+import resource
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import frappe
+
+from ecom_custom.benchmarks import payloads
+from ecom_custom.benchmarks.fake_shopify import FakeShopify
+from ecom_custom.shopify import instrumentation
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+STAGES = ("new", "existing", "existing_changed", "reconcile", "fetch", "tracking")
+# Payload revision served per stage; a higher revision changes the order's fingerprint.
+STAGE_REVISIONS = {"existing_changed": 1, "reconcile": 2}
+
+
+def run(
+	sizes=DEFAULT_SIZES, stages=STAGES, bucket_size: int = 400, per_stage: bool = True
+) -> list[dict[str, Any]]:
+	"""Benchmark each stage at each size and print a table; returns the result rows.
+
+	``new`` syncs orders that do not exist yet, ``existing`` replays the same payloads (skipped by
+	their fingerprint), ``existing_changed`` replays edited payloads, ``reconcile`` re-fetches
+	every order by name, ``fetch`` only walks the paginated order list and ``tracking`` loads
+	fulfillment tracking with a cold cache.
+
+	Peak RSS is the process high-water mark after the stage, so it never decreases. With
+	``per_stage`` every order is instrumented (see :mod:`ecom_custom.shopify.instrumentation`)
+	and the pipeline stage breakdown is printed after the table.
+	"""
+
+	if not (frappe.conf.get("allow_tests") or frappe.conf.get("developer_mode")):
+		frappe.throw("Benchmarks create documents; enable allow_tests or developer_mode on a throwaway site")
+
+	if isinstance(sizes, (int, str)):
+		sizes = [int(size) for size in str(sizes).split(",")]
+	if isinstance(stages, str):
+		stages = [stage.strip() for stage in stages.split(",")]
+
+	sample_rate = frappe.conf.get("shopify_instrumentation_sample_rate")
+	if per_stage:
+		frappe.conf.shopify_instrumentation_sample_rate = 1
+
+	started = time.time()
+	results = []
+	try:
+		for size in sizes:
+			with FakeShopify(int(size), bucket_size=bucket_size) as fake, local_shopify_session(fake.url):
+				for stage in stages:
+					_reset_job_caches()
+					fake.revision = STAGE_REVISIONS.get(stage, 0)
+					results.append(_STAGES[stage](fake, int(size)))
+					frappe.db.commit()
+	finally:
+		frappe.conf.shopify_instrumentation_sample_rate = sample_rate
+
+	_print_results(results)
+	if per_stage:
+		minutes = int((time.time() - started) // 60) + 1
+		_print_stage_breakdown(instrumentation.get_order_sync_metrics(minutes)["stages"])
+	return results
+
+
+@contextmanager
+def local_shopify_session(base_url: str) -> Iterator[None]:
+	"""Point every ``temp_shopify_session`` at ``base_url`` instead of the configured shop.
+
+	The session is still opened with the configured shop and token; only the resource site is
+	replaced, since a shop domain is always rewritten to ``https://<shop>.myshopify.com``.
+	"""
+
+	import shopify
+
+	original_temp = shopify.Session.temp
+
+	@contextmanager
+	def temp(domain, version, token):
+		with original_temp(domain, version, token):
+			shopify.ShopifyResource.site = f"{base_url}/admin/api/{shopify.ShopifyResource.get_version()}"
+			yield
+
+	shopify.Session.temp = staticmethod(temp)
+	try:
+		yield
+	finally:
+		shopify.Session.temp = original_temp
+
+
+def measure(stage: str, fake: FakeShopify, size: int, func: Callable[[], int | None]) -> dict[str, Any]:
+	"""Run ``func`` and report throughput, SQL and HTTP calls per order and peak RSS.
+
+	HTTP calls are counted by the fake server rather than by :func:`instrumentation.capture`,
+	which only sees the calling thread and would miss the reconcile stage's fetch threads.
+	"""
+
+	http_calls_before = fake.total_calls
+	throttled_before = fake.calls["throttled"]
+	with instrumentation.capture() as metrics:
+		orders = func()
+
+	orders = size if orders is None else orders
+	per_order = max(orders, 1)
+	elapsed = metrics["ms"] / 1000
+
+	return {
+		"stage": stage,
+		"size": size,
+		"orders": orders,
+		"seconds": round(elapsed, 3),
+		"orders_per_second": round(orders / elapsed, 1) if elapsed else None,
+		"queries_per_order": round(metrics["queries"] / per_order, 2),
+		"http_calls_per_order": round((fake.total_calls - http_calls_before) / per_order, 3),
+		"throttled": fake.calls["throttled"] - throttled_before,
+		"peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+	}
+
+
+def _bench_sync(stage: str) -> Callable[[FakeShopify, int], dict[str, Any]]:
+	def bench(fake: FakeShopify, size: int) -> dict[str, Any]:
+		from ecom_custom.shopify.bulk_sync import _sync_order
+
+		def sync() -> int:
+			for index in range(size):
+				_sync_order(payloads.generate_order(index, revision=fake.revision))
+			return size
+
+		return measure(stage, fake, size, sync)
+
+	return bench
+
+
+def _bench_reconcile(fake: FakeShopify, size: int) -> dict[str, Any]:
+	from ecom_custom.shopify.reconcile import reconcile_sales_orders
+
+	names = _benchmark_sales_orders(size)
+	if not names:
+		# An empty list would reconcile every Shopify Sales Order on the site.
+		frappe.throw("No benchmark Sales Orders to reconcile; run the 'new' stage first")
+	return measure("reconcile", fake, size, lambda: reconcile_sales_orders(order_names=names)["total"])
+
+
+def _bench_fetch(fake: FakeShopify, size: int) -> dict[str, Any]:
+	from ecom_custom.shopify.order_overrides import fetch_old_orders_any
+
+	def fetch() -> int:
+		start, end = payloads.created_at(0), payloads.created_at(size - 1)
+		return sum(1 for _order in fetch_old_orders_any(start, end))
+
+	return measure("fetch", fake, size, fetch)
+
+
+def _bench_tracking(fake: FakeShopify, size: int) -> dict[str, Any]:
+	from ecom_custom.shopify import tracking
+
+	fulfillment_ids = [payloads.generate_fulfillment(index)["id"] for index in range(0, size, 3)]
+	tracking.invalidate_tracking_cache(fulfillment_ids)
+
+	def load() -> int:
+		for fulfillment_id in fulfillment_ids:
+			tracking.get_tracking_payload(fulfillment_id)
+		return len(fulfillment_ids)
+
+	return measure("tracking", fake, size, load)
+
+
+def _benchmark_sales_orders(size: int) -> list[str]:
+	from ecommerce_integrations.shopify.constants import ORDER_ID_FIELD
+
+	order_ids = [str(payloads.order_id(index)) for index in range(size)]
+	return frappe.get_all("Sales Order", filters={ORDER_ID_FIELD: ["in", order_ids]}, pluck="name", limit=0)
+
+
+def _reset_job_caches() -> None:
+	frappe.local.shopify_sales_order_names = None
+	frappe.local.shopify_payload_hashes = None
+	frappe.local.shopify_sales_order_docstatus = None
+
+
+def _print_results(results: list[dict[str, Any]]) -> None:
+	columns = list(results[0]) if results else []
+	print("\t".join(columns))
+	for row in results:
+		print("\t".join(str(row[column]) for column in columns))
+
+
+def _print_stage_breakdown(stages: dict[str, dict[str, Any]]) -> None:
+	print("pipeline_stage\torders\tmean_ms\tmean_queries\tmean_http_calls")
+	for name, summary in sorted(stages.items()):
+		means = [round((summary.get(metric) or {}).get("mean", 0.0), 2) for metric in instrumentation.BUCKETS]
+		print("\t".join(str(value) for value in (name, summary["count"], *means)))
+
+
+_STAGES: dict[str, Callable[[FakeShopify, int], dict[str, Any]]] = {
+	"new": _bench_sync("new"),
+	"existing": _bench_sync("existing"),
+	"existing_changed": _bench_sync("existing_changed"),
+	"reconcile": _bench_reconcile,
+	"fetch": _bench_fetch,
+	"tracking": _bench_tracking,
+}
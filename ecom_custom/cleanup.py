@@ -1,6 +1,25 @@
 from __future__ import annotations
 
+import time
+
 import frappe
+from frappe.utils import cint
+
+DEFAULT_CHUNK_SIZE = 200
+CLEANUP_SAVEPOINT = "shopify_cleanup"
+CLEANUP_JOB_TIMEOUT = 6 * 60 * 60
+DEADLOCK_RETRIES = 3
+CLEANUP_DOCTYPES = ("Sales Order", "Delivery Note", "Sales Invoice")
+
+_SHOPIFY_ORDERS_QUERY = "select name from `tabSales Order` where coalesce(shopify_order_id, '') != ''"
+_LINKED_DELIVERY_NOTES_QUERY = f"""
+	select dni.parent from `tabDelivery Note Item` dni
+	where dni.against_sales_order in ({_SHOPIFY_ORDERS_QUERY})
+"""
+_LINKED_SALES_INVOICES_QUERY = f"""
+	select sii.parent from `tabSales Invoice Item` sii
+	where sii.sales_order in ({_SHOPIFY_ORDERS_QUERY})
+"""
 
 
 def delete_shopify_orders() -> dict[str, int]:
@@ -29,6 +48,251 @@ def delete_shopify_orders() -> dict[str, int]:
 	return stats
 
 
+def delete_shopify_orders_bulk(chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict[str, int]:
+	"""Set-based variant of :func:`delete_shopify_orders` for large sites.
+
+	Linked Delivery Notes and Sales Invoices are collected with two joined queries up front and
+	merged with their Sales Orders into independent groups. Each group is cancelled and deleted
+	under one savepoint, so a linked document that fails keeps its whole group (Sales Order
+	included) in place instead of leaving it orphaned; a commit follows every ``chunk_size``
+	groups. Anything already deleted drops out of the queries, so re-running after an
+	interruption resumes where the previous run stopped.
+	"""
+
+	return _delete_groups(_sorted_groups(), chunk_size)
+
+
+def plan_shopify_order_cleanup() -> dict[str, int]:
+	"""Dry run: count what a cleanup would cancel and delete, without touching anything.
+
+	Cancelling a submitted document posts one reversing row per active ledger row, so the GL and
+	stock ledger counts approximate the reversal volume the cleanup will write.
+	"""
+
+	plan = {doctype: 0 for doctype in CLEANUP_DOCTYPES}
+	plan.update({f"{doctype} (submitted)": 0 for doctype in CLEANUP_DOCTYPES})
+
+	for doctype, subquery in (
+		("Sales Order", _SHOPIFY_ORDERS_QUERY),
+		("Delivery Note", _LINKED_DELIVERY_NOTES_QUERY),
+		("Sales Invoice", _LINKED_SALES_INVOICES_QUERY),
+	):
+		for docstatus, count in frappe.db.sql(
+			f"select docstatus, count(*) from `tab{doctype}` where name in ({subquery}) group by docstatus"
+		):
+			plan[doctype] += cint(count)
+			if cint(docstatus) == 1:
+				plan[f"{doctype} (submitted)"] += cint(count)
+
+	vouchers = f"""
+		(voucher_type = 'Delivery Note' and voucher_no in ({_LINKED_DELIVERY_NOTES_QUERY}))
+		or (voucher_type = 'Sales Invoice' and voucher_no in ({_LINKED_SALES_INVOICES_QUERY}))
+	"""
+	for key, ledger in (
+		("gl_entries_to_reverse", "GL Entry"),
+		("stock_ledger_entries_to_reverse", "Stock Ledger Entry"),
+	):
+		plan[key] = cint(
+			frappe.db.sql(f"select count(*) from `tab{ledger}` where is_cancelled = 0 and ({vouchers})")[0][0]
+		)
+
+	return plan
+
+
+def enqueue_delete_shopify_orders(chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1) -> int:
+	"""Run the bulk cleanup in the background and return the number of jobs enqueued.
+
+	With ``workers > 1`` the documents are split into independent groups (a Sales Order with its
+	Delivery Notes and Sales Invoices, merged when documents are shared between orders). Groups are
+	ordered by their first Sales Order and cut into that many contiguous ranges of similar size;
+	each ``long`` job gets the boundaries of its range and rebuilds its groups itself.
+	"""
+
+	workers = max(cint(workers), 1)
+	if workers == 1:
+		frappe.enqueue(
+			"ecom_custom.cleanup.delete_shopify_orders_bulk",
+			queue="long",
+			timeout=CLEANUP_JOB_TIMEOUT,
+			job_id="ecom_custom::delete_shopify_orders",
+			deduplicate=True,
+			chunk_size=chunk_size,
+		)
+		return 1
+
+	groups = _sorted_groups()
+	target = sum(_group_size(group) for group in groups) / workers
+
+	ranges: list[tuple[str, str]] = []
+	first = None
+	size = 0
+	for position, group in enumerate(groups):
+		first = first or _group_key(group)
+		size += _group_size(group)
+		if size >= target * (len(ranges) + 1) or position == len(groups) - 1:
+			ranges.append((first, _group_key(group)))
+			first = None
+
+	for index, (first_sales_order, last_sales_order) in enumerate(ranges):
+		frappe.enqueue(
+			"ecom_custom.cleanup.delete_shopify_order_groups",
+			queue="long",
+			timeout=CLEANUP_JOB_TIMEOUT,
+			job_id=f"ecom_custom::delete_shopify_orders::{index}",
+			deduplicate=True,
+			first_sales_order=first_sales_order,
+			last_sales_order=last_sales_order,
+			chunk_size=chunk_size,
+		)
+	return len(ranges)
+
+
+def delete_shopify_order_groups(
+	first_sales_order: str, last_sales_order: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> dict[str, int]:
+	"""Cancel and delete the order groups whose first Sales Order lies between the boundaries."""
+
+	groups = [
+		group for group in _sorted_groups() if first_sales_order <= _group_key(group) <= last_sales_order
+	]
+	return _delete_groups(groups, chunk_size)
+
+
+def _delete_groups(groups: list[dict[str, list[str]]], chunk_size: int) -> dict[str, int]:
+	"""Delete ``groups``, committing every ``chunk_size``.
+
+	A deadlock rolls back the whole transaction, so the chunk is retried from its start; groups it
+	had already removed are skipped by the retry.
+	"""
+
+	logger = frappe.logger("ecom_custom.cleanup")
+	stats = {"Sales Order": 0, "Delivery Note": 0, "Sales Invoice": 0, "errors": 0}
+	chunk_size = max(cint(chunk_size), 1)
+
+	for start in range(0, len(groups), chunk_size):
+		chunk = groups[start : start + chunk_size]
+		for attempt in range(1, DEADLOCK_RETRIES + 1):
+			try:
+				chunk_stats = _delete_group_chunk(chunk)
+				frappe.db.commit()
+			except frappe.QueryDeadlockError:
+				frappe.db.rollback()
+				if attempt == DEADLOCK_RETRIES:
+					frappe.log_error(
+						message=frappe.get_traceback(), title="Shopify cleanup deadlocked on order groups"
+					)
+					stats["errors"] += len(chunk)
+					break
+				time.sleep(attempt)
+				continue
+
+			for key, value in chunk_stats.items():
+				stats[key] += value
+			break
+
+		logger.info(f"Shopify cleanup: {start + len(chunk)}/{len(groups)} order groups processed")
+
+	return stats
+
+
+def _delete_group_chunk(groups: list[dict[str, list[str]]]) -> dict[str, int]:
+	"""Delete ``groups`` in the open transaction; deadlocks propagate, other errors skip the group."""
+
+	stats = {"Sales Order": 0, "Delivery Note": 0, "Sales Invoice": 0, "errors": 0}
+
+	for group in groups:
+		deleted = {doctype: 0 for doctype in CLEANUP_DOCTYPES}
+		frappe.db.savepoint(CLEANUP_SAVEPOINT)
+		try:
+			for doctype in ("Delivery Note", "Sales Invoice", "Sales Order"):
+				for name in group.get(doctype) or []:
+					if _cancel_and_delete(doctype, name, ignore_links=doctype == "Sales Order"):
+						deleted[doctype] += 1
+		except frappe.QueryDeadlockError:
+			# The transaction, savepoint included, is already gone; the caller retries the chunk.
+			raise
+		except Exception:
+			frappe.db.rollback(save_point=CLEANUP_SAVEPOINT)
+			frappe.log_error(message=frappe.get_traceback(), title="Shopify cleanup failed for order group")
+			stats["errors"] += 1
+			continue
+
+		for doctype, count in deleted.items():
+			stats[doctype] += count
+
+	return stats
+
+
+def _sorted_groups() -> list[dict[str, list[str]]]:
+	return sorted(_group_documents(*_collect_links()), key=_group_key)
+
+
+def _collect_links() -> tuple[list[str], list[tuple], list[tuple]]:
+	sales_orders = frappe.db.sql(_SHOPIFY_ORDERS_QUERY, pluck=True)
+
+	delivery_note_links = frappe.db.sql(
+		"""
+		select distinct dni.parent, dni.against_sales_order
+		from `tabDelivery Note Item` dni
+		inner join `tabSales Order` so on so.name = dni.against_sales_order
+		where coalesce(so.shopify_order_id, '') != ''
+		"""
+	)
+
+	sales_invoice_links = frappe.db.sql(
+		"""
+		select distinct sii.parent, sii.sales_order, sii.delivery_note
+		from `tabSales Invoice Item` sii
+		inner join `tabSales Order` so on so.name = sii.sales_order
+		where coalesce(so.shopify_order_id, '') != ''
+		"""
+	)
+
+	return sales_orders, delivery_note_links, sales_invoice_links
+
+
+def _group_documents(
+	sales_orders: list[str], delivery_note_links: list[tuple], sales_invoice_links: list[tuple]
+) -> list[dict[str, list[str]]]:
+	"""Union documents that share links into groups that can be deleted independently."""
+
+	parents: dict[tuple[str, str], tuple[str, str]] = {}
+
+	def find(node):
+		parents.setdefault(node, node)
+		while parents[node] != node:
+			parents[node] = parents[parents[node]]
+			node = parents[node]
+		return node
+
+	def union(left, right):
+		parents[find(left)] = find(right)
+
+	for name in sales_orders:
+		find(("Sales Order", name))
+	for dn, so in delivery_note_links:
+		union(("Delivery Note", dn), ("Sales Order", so))
+	for si, so, dn in sales_invoice_links:
+		union(("Sales Invoice", si), ("Sales Order", so))
+		if dn and ("Delivery Note", dn) in parents:
+			union(("Sales Invoice", si), ("Delivery Note", dn))
+
+	groups: dict[tuple[str, str], dict[str, list[str]]] = {}
+	for node in list(parents):
+		doctype, name = node
+		groups.setdefault(find(node), {key: [] for key in CLEANUP_DOCTYPES})[doctype].append(name)
+	return list(groups.values())
+
+
+def _group_key(group: dict[str, list[str]]) -> str:
+	# Every group holds at least one Sales Order, and removing other groups never changes it.
+	return min(group["Sales Order"])
+
+
+def _group_size(group: dict[str, list[str]]) -> int:
+	return sum(len(names) for names in group.values())
+
+
 def _linked_delivery_notes(sales_order: str) -> set[str]:
 	dn_items = frappe.get_all(
 		"Delivery Note Item",
@@ -49,7 +313,12 @@ def _linked_sales_invoices(sales_order: str) -> set[str]:
 	return {name for name in si_items if name}
 
 
-def _cancel_and_delete(doctype: str, name: str, ignore_links: bool = False) -> None:
+def _cancel_and_delete(doctype: str, name: str, ignore_links: bool = False) -> bool:
+	"""Cancel (if submitted) and delete a document; ``False`` when it no longer exists."""
+
+	if not frappe.db.exists(doctype, name):
+		return False
+
 	doc = frappe.get_doc(doctype, name)
 	if ignore_links:
 		doc.flags.ignore_links = True
@@ -64,3 +333,4 @@ def _cancel_and_delete(doctype: str, name: str, ignore_links: bool = False) -> N
 		force=True,
 		ignore_missing=True,
 	)
+	return True
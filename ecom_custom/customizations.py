@@ -3,6 +3,8 @@ from __future__ import annotations
 import frappe
 from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
 
+from ecom_custom.shopify.columns import clear_column_cache
+
 
 def ensure_custom_fields() -> None:
 	"""Create custom fields required by the Shopify overrides.
@@ -157,6 +159,8 @@ def ensure_custom_fields() -> None:
 					"fieldtype": "Small Text",
 					"insert_after": "shopify_discount_amount",
 					"read_only": 1,
+					# Superseded by the Shopify Tracking Entry doctype; kept for historical data.
+					"hidden": 1,
 					"allow_on_submit": 1,
 				},
 				{
@@ -175,6 +179,16 @@ def ensure_custom_fields() -> None:
 					"read_only": 1,
 					"allow_on_submit": 1,
 				},
+				{
+					"fieldname": "shopify_payload_hash",
+					"label": "Shopify Payload Hash",
+					"fieldtype": "Data",
+					"insert_after": "shopify_cancel_reason",
+					"read_only": 1,
+					"hidden": 1,
+					"no_copy": 1,
+					"allow_on_submit": 1,
+				},
 			]
 		),
 		"Delivery Note": [
@@ -191,6 +205,7 @@ def ensure_custom_fields() -> None:
 
 	create_custom_fields(custom_fields, ignore_validate=True)
 	_update_field_layouts()
+	clear_column_cache()
 
 
 def _update_field_layouts() -> None:
@@ -203,6 +218,7 @@ def _update_field_layouts() -> None:
 			"shopify_tracking_info": "shopify_discount_amount",
 			"shopify_last_synced_at": "shopify_tracking_info",
 			"shopify_cancel_reason": "shopify_last_synced_at",
+			"shopify_payload_hash": "shopify_cancel_reason",
 		}
 	}
 
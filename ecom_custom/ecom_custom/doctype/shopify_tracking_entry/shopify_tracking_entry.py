@@ -0,0 +1,14 @@
+# Copyright (c) 2026, Roland Trebo and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class ShopifyTrackingEntry(Document):
+	pass
+
+
+def on_doctype_update():
+	# One entry per tracking number of a Sales Order / Delivery Note pair; writers upsert against this key.
+	frappe.db.add_unique("Shopify Tracking Entry", ["sales_order", "delivery_note", "tracking_number"])
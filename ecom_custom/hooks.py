@@ -141,15 +141,38 @@ doc_events = {
 	"Delivery Note": {
 		"before_save": "ecom_custom.shopify.tracking.populate_delivery_note_tracking",
 		"on_submit": "ecom_custom.shopify.tracking.populate_delivery_note_tracking",
+		"on_trash": "ecom_custom.shopify.tracking.delete_tracking_entries",
+	},
+	"Sales Order": {
+		"on_trash": "ecom_custom.shopify.tracking.delete_tracking_entries",
 	},
 	"Sales Invoice": {
 		"before_validate": "ecom_custom.shopify.fiscal.ensure_customer_fiscal_code",
 	},
+	"Territory": {
+		"after_rename": "ecom_custom.shopify.order_overrides.clear_territory_cache",
+		"on_trash": "ecom_custom.shopify.order_overrides.clear_territory_cache",
+	},
 }
 
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"cron": {
+		"* * * * *": [
+			"ecom_custom.shopify.coalesce.process_coalesced_orders",
+		],
+		"*/15 * * * *": [
+			"ecom_custom.shopify.reconcile.enqueue_incremental_reconcile",
+			"ecom_custom.shopify.bulk_sync.requeue_stalled_backfill_windows",
+		],
+	},
+	"daily_long": [
+		"ecom_custom.shopify.tracking.refresh_stale_tracking",
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"ecom_custom.tasks.all"
@@ -185,12 +208,20 @@ try:
 	from ecommerce_integrations.shopify import order as _base_shopify_order
 	from ecom_custom.shopify import order_overrides as _order_overrides
 	from ecom_custom.shopify import customer_patch
+	from ecom_custom.shopify import tracking as _tracking
+	from ecommerce_integrations.shopify.constants import EVENT_MAPPER as _EVENT_MAPPER
 
 	_base_shopify_order.sync_sales_order = _order_overrides.sync_sales_order
 	_base_shopify_order._fetch_old_orders = _order_overrides.fetch_old_orders_any
 
 	# Ensure Shopify customers always carry a fiscal code placeholder to satisfy Italian validations.
 	customer_patch.apply()
+
+	# Fulfillment webhooks carry fresh tracking data; drop cached copies and refresh the notes.
+	_tracking.patch_fulfillment_webhooks()
+
+	# Bursts of orders/updated webhooks are collapsed into one sync per order.
+	_EVENT_MAPPER["orders/updated"] = "ecom_custom.shopify.coalesce.park_order_update"
 except Exception:
 	pass
 #
@@ -208,7 +239,7 @@ except Exception:
 # Ignore links to specified DocTypes when deleting documents
 # -----------------------------------------------------------
 
-# ignore_links_on_delete = ["Communication", "ToDo"]
+ignore_links_on_delete = ["Shopify Tracking Entry"]
 
 # Request Events
 # ----------------
@@ -0,0 +1,7 @@
+from ecom_custom.shopify.fiscal import backfill_customer_fiscal_codes
+
+
+def execute():
+	"""Fill the placeholder fiscal code on Shopify customers that still lack one."""
+
+	backfill_customer_fiscal_codes()
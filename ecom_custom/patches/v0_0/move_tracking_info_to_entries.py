@@ -0,0 +1,31 @@
+import json
+
+import frappe
+
+from ecom_custom.shopify.columns import has_writable_column
+from ecom_custom.shopify.tracking import _write_tracking_entry
+
+
+def execute():
+	"""Copy the legacy ``shopify_tracking_info`` JSON blobs into Shopify Tracking Entry rows."""
+
+	if not has_writable_column("Sales Order", "shopify_tracking_info"):
+		return
+
+	rows = frappe.get_all(
+		"Sales Order",
+		filters={"shopify_tracking_info": ["is", "set"]},
+		fields=["name", "shopify_tracking_info"],
+		limit=0,
+	)
+
+	for row in rows:
+		try:
+			entries = json.loads(row.shopify_tracking_info or "[]")
+		except json.JSONDecodeError:
+			continue
+
+		for entry in entries:
+			delivery_note = entry.get("delivery_note") if isinstance(entry, dict) else None
+			if delivery_note and frappe.db.exists("Delivery Note", delivery_note):
+				_write_tracking_entry(row.name, delivery_note, entry)
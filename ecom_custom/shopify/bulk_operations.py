@@ -0,0 +1,517 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+from zoneinfo import ZoneInfo
+
+import frappe
+import requests
+from ecommerce_integrations.shopify.connection import temp_shopify_session
+from frappe.utils import cint
+
+from ecom_custom.shopify.order_overrides import ORDER_PAGE_SIZE, to_shopify_datetime
+
+BULK_POLL_SECONDS = 10
+BULK_TIMEOUT_SECONDS = 6 * 60 * 60
+BULK_DOWNLOAD_TIMEOUT = 60
+
+ADDRESS_FIELDS = """
+	firstName lastName name company address1 address2 city province provinceCode zip country countryCodeV2
+	phone latitude longitude
+"""
+
+MONEY_BAG_FIELDS = "shopMoney { amount currencyCode } presentmentMoney { amount currencyCode }"
+
+DISCOUNT_ALLOCATION_FIELDS = (
+	"discountAllocations { allocatedAmountSet { %(money)s } discountApplication { index } }"
+)
+
+TAX_LINE_FIELDS = "taxLines { title rate channelLiable priceSet { %(money)s } }"
+
+# Connections (discount applications, line items, shipping lines) are emitted by Shopify as
+# separate JSONL lines that reference their order through ``__parentId``.
+BULK_ORDERS_QUERY = """
+{
+	orders(query: "%(search)s", sortKey: CREATED_AT) {
+		edges {
+			node {
+				id
+				legacyResourceId
+				name
+				email
+				createdAt
+				updatedAt
+				closedAt
+				cancelReason
+				currencyCode
+				taxesIncluded
+				note
+				tags
+				displayFinancialStatus
+				displayFulfillmentStatus
+				paymentGatewayNames
+				totalDiscountsSet { %(money)s }
+				totalPriceSet { %(money)s }
+				paymentTerms { id dueInDays paymentTermsName paymentTermsType }
+				customer { legacyResourceId firstName lastName email phone }
+				shippingAddress { %(address)s }
+				billingAddress { %(address)s }
+				discountApplications {
+					edges {
+						node {
+							__typename
+							index
+							targetType
+							... on DiscountCodeApplication { code }
+							value { __typename ... on PricingPercentageValue { percentage } }
+						}
+					}
+				}
+				lineItems {
+					edges {
+						node {
+							id
+							title
+							name
+							sku
+							vendor
+							variantTitle
+							quantity
+							unfulfilledQuantity
+							requiresShipping
+							isGiftCard
+							taxable
+							originalUnitPriceSet { %(money)s }
+							totalDiscountSet { %(money)s }
+							variant { legacyResourceId }
+							product { id legacyResourceId }
+							customAttributes { key value }
+							%(tax_lines)s
+							%(discount_allocations)s
+						}
+					}
+				}
+				shippingLines {
+					edges {
+						node {
+							id
+							title
+							code
+							source
+							phone
+							carrierIdentifier
+							originalPriceSet { %(money)s }
+							discountedPriceSet { %(money)s }
+							%(tax_lines)s
+							%(discount_allocations)s
+						}
+					}
+				}
+			}
+		}
+	}
+}
+"""
+
+SHOP_TIMEZONE_QUERY = "{ shop { ianaTimezone } }"
+
+RUN_BULK_QUERY_MUTATION = """
+mutation RunBulkQuery($query: String!) {
+	bulkOperationRunQuery(query: $query) {
+		bulkOperation { id status }
+		userErrors { field message }
+	}
+}
+"""
+
+BULK_OPERATION_STATUS_QUERY = """
+query BulkOperationStatus($id: ID!) {
+	node(id: $id) {
+		... on BulkOperation { id status errorCode objectCount url partialDataUrl }
+	}
+}
+"""
+
+# REST reports an unfulfilled order as ``null`` and a partial one as ``partial``; other GraphQL
+# statuses have no REST counterpart and map to ``null`` as well.
+FULFILLMENT_STATUS_MAP = {
+	"FULFILLED": "fulfilled",
+	"PARTIALLY_FULFILLED": "partial",
+	"RESTOCKED": "restocked",
+	"UNFULFILLED": None,
+}
+
+
+def iter_bulk_orders(from_time, to_time, date_field: str = "created_at") -> Iterator[dict[str, Any]]:
+	"""Yield REST-shaped order payloads for a date range, exported through a GraphQL bulk operation.
+
+	One bulk operation replaces the page-by-page REST walk of :func:`fetch_old_orders_any`; the
+	resulting JSONL file is streamed, so memory stays bounded by a single order. ``date_field``
+	selects the filter, ``created_at`` or ``updated_at``.
+	"""
+
+	url = wait_for_bulk_operation(start_bulk_orders_query(from_time, to_time, date_field))
+	if not url:
+		return
+
+	timezone = get_shop_timezone()
+	with requests.get(url, stream=True, timeout=BULK_DOWNLOAD_TIMEOUT) as response:
+		response.raise_for_status()
+		yield from iter_orders_from_jsonl(response.iter_lines(decode_unicode=True), timezone=timezone)
+
+
+def iter_bulk_order_pages(
+	from_time, to_time, date_field: str = "created_at", page_size: int = ORDER_PAGE_SIZE
+) -> Iterator[list[dict[str, Any]]]:
+	"""Group :func:`iter_bulk_orders` into pages, so callers can prime Sales Order lookups per page."""
+
+	page: list[dict[str, Any]] = []
+	for order in iter_bulk_orders(from_time, to_time, date_field=date_field):
+		page.append(order)
+		if len(page) >= page_size:
+			yield page
+			page = []
+
+	if page:
+		yield page
+
+
+@temp_shopify_session
+def start_bulk_orders_query(from_time, to_time, date_field: str = "created_at") -> str:
+	"""Start a bulk export of the orders in the range and return the bulk operation id."""
+
+	import shopify
+
+	search = " AND ".join(
+		(
+			f"{date_field}:>='{to_shopify_datetime(from_time)}'",
+			f"{date_field}:<='{to_shopify_datetime(to_time)}'",
+		)
+	)
+	query = BULK_ORDERS_QUERY % {
+		"search": search,
+		"address": ADDRESS_FIELDS.strip(),
+		"money": MONEY_BAG_FIELDS,
+		"tax_lines": TAX_LINE_FIELDS % {"money": MONEY_BAG_FIELDS},
+		"discount_allocations": DISCOUNT_ALLOCATION_FIELDS % {"money": MONEY_BAG_FIELDS},
+	}
+
+	response = json.loads(shopify.GraphQL().execute(RUN_BULK_QUERY_MUTATION, variables={"query": query}))
+	result = (response.get("data") or {}).get("bulkOperationRunQuery") or {}
+	errors = result.get("userErrors") or response.get("errors")
+	if errors or not result.get("bulkOperation"):
+		frappe.throw(f"Shopify bulk operation could not be started: {json.dumps(errors)}")
+
+	return result["bulkOperation"]["id"]
+
+
+def wait_for_bulk_operation(
+	operation_id: str, poll_seconds: int = BULK_POLL_SECONDS, timeout: int = BULK_TIMEOUT_SECONDS
+) -> str | None:
+	"""Poll a bulk operation until it finishes and return its download URL (``None`` if empty)."""
+
+	deadline = time.monotonic() + timeout
+	while True:
+		operation = _get_bulk_operation(operation_id)
+		status = operation.get("status")
+
+		if status == "COMPLETED":
+			return operation.get("url")
+		if status in ("FAILED", "CANCELED", "EXPIRED"):
+			frappe.throw(
+				f"Shopify bulk operation {operation_id} ended as {status}: {operation.get('errorCode')}"
+			)
+		if time.monotonic() > deadline:
+			frappe.throw(f"Shopify bulk operation {operation_id} did not finish in {timeout} seconds")
+
+		time.sleep(poll_seconds)
+
+
+@temp_shopify_session
+def get_shop_timezone() -> str | None:
+	"""IANA timezone of the shop; REST reports order timestamps in it, GraphQL in UTC."""
+
+	import shopify
+
+	response = json.loads(shopify.GraphQL().execute(SHOP_TIMEZONE_QUERY))
+	return ((response.get("data") or {}).get("shop") or {}).get("ianaTimezone")
+
+
+@temp_shopify_session
+def _get_bulk_operation(operation_id: str) -> dict[str, Any]:
+	import shopify
+
+	response = json.loads(
+		shopify.GraphQL().execute(BULK_OPERATION_STATUS_QUERY, variables={"id": operation_id})
+	)
+	return (response.get("data") or {}).get("node") or {}
+
+
+def iter_orders_from_jsonl(lines: Iterable[str], timezone: str | None = None) -> Iterator[dict[str, Any]]:
+	"""Reassemble bulk JSONL lines into REST-shaped order payloads.
+
+	Shopify writes each child line after its parent, so an order is complete once the next
+	top-level line (one without ``__parentId``) appears. Timestamps are converted to ``timezone``
+	(the shop's), so they read exactly as in the REST payload.
+	"""
+
+	order: dict[str, Any] | None = None
+	children: dict[str, list[dict[str, Any]]] = _empty_children()
+
+	for line in lines:
+		if not line:
+			continue
+		node = json.loads(line)
+
+		if node.get("__parentId"):
+			kind = _child_kind(node)
+			if kind in children:
+				children[kind].append(node)
+			continue
+
+		if order is not None:
+			yield _map_order(order, children, timezone)
+		order = node
+		children = _empty_children()
+
+	if order is not None:
+		yield _map_order(order, children, timezone)
+
+
+def _empty_children() -> dict[str, list[dict[str, Any]]]:
+	return {"DiscountApplication": [], "LineItem": [], "ShippingLine": []}
+
+
+def _child_kind(node: dict[str, Any]) -> str:
+	# Discount applications have no id; their ``__typename`` names the application type.
+	if node.get("__typename", "").endswith("Application"):
+		return "DiscountApplication"
+	return _gid_type(node.get("id"))
+
+
+def _map_order(
+	node: dict[str, Any], children: dict[str, list[dict[str, Any]]], timezone: str | None = None
+) -> dict[str, Any]:
+	line_items = [_map_line_item(item) for item in children["LineItem"]]
+	shipping_lines = [_map_shipping_line(line) for line in children["ShippingLine"]]
+
+	return {
+		"id": cint(node.get("legacyResourceId")) or _gid_id(node.get("id")),
+		"admin_graphql_api_id": node.get("id"),
+		"name": node.get("name"),
+		"email": node.get("email"),
+		"created_at": _timestamp(node.get("createdAt"), timezone),
+		"updated_at": _timestamp(node.get("updatedAt"), timezone),
+		"closed_at": _timestamp(node.get("closedAt"), timezone),
+		"cancel_reason": _lower(node.get("cancelReason")),
+		"currency": node.get("currencyCode"),
+		"taxes_included": node.get("taxesIncluded"),
+		"note": node.get("note"),
+		"tags": ", ".join(node.get("tags") or []),
+		"financial_status": _lower(node.get("displayFinancialStatus")),
+		# Statuses REST has no value for (in progress, on hold, ...) are ``null`` there.
+		"fulfillment_status": FULFILLMENT_STATUS_MAP.get(node.get("displayFulfillmentStatus")),
+		"payment_gateway_names": node.get("paymentGatewayNames") or [],
+		"discount_codes": _map_discount_codes(children["DiscountApplication"], line_items + shipping_lines),
+		"total_discounts": _money(node.get("totalDiscountsSet")),
+		"total_price": _money(node.get("totalPriceSet")),
+		"payment_terms": _map_payment_terms(node.get("paymentTerms")),
+		"customer": _map_customer(node.get("customer")),
+		"shipping_address": _map_address(node.get("shippingAddress")),
+		"billing_address": _map_address(node.get("billingAddress")),
+		"line_items": line_items,
+		"shipping_lines": shipping_lines,
+	}
+
+
+def _map_discount_codes(
+	applications: list[dict[str, Any]], allocated_to: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+	"""REST ``discount_codes``: one entry per code application, with the amount it allocated."""
+
+	allocated: dict[int, Decimal] = {}
+	for row in allocated_to:
+		for allocation in row["discount_allocations"]:
+			index = allocation["discount_application_index"]
+			allocated[index] = allocated.get(index, Decimal(0)) + Decimal(allocation["amount"])
+
+	codes = []
+	for application in sorted(applications, key=lambda application: cint(application.get("index"))):
+		if not application.get("code"):
+			continue
+		if application.get("targetType") == "SHIPPING_LINE":
+			discount_type = "shipping"
+		elif (application.get("value") or {}).get("__typename") == "PricingPercentageValue":
+			discount_type = "percentage"
+		else:
+			discount_type = "fixed_amount"
+		codes.append(
+			{
+				"code": application["code"],
+				"amount": _format_amount(allocated.get(cint(application.get("index")), Decimal(0))),
+				"type": discount_type,
+			}
+		)
+	return codes
+
+
+def _map_customer(customer: dict[str, Any] | None) -> dict[str, Any] | None:
+	if not customer:
+		return None
+	return {
+		"id": cint(customer.get("legacyResourceId")) or None,
+		"first_name": customer.get("firstName"),
+		"last_name": customer.get("lastName"),
+		"email": customer.get("email"),
+		"phone": customer.get("phone"),
+	}
+
+
+def _map_address(address: dict[str, Any] | None) -> dict[str, Any] | None:
+	# Exactly the keys of a REST order address, since the whole dict is fingerprinted and stored.
+	if not address:
+		return None
+	return {
+		"first_name": address.get("firstName"),
+		"last_name": address.get("lastName"),
+		"name": address.get("name"),
+		"company": address.get("company"),
+		"address1": address.get("address1"),
+		"address2": address.get("address2"),
+		"city": address.get("city"),
+		"province": address.get("province"),
+		"province_code": address.get("provinceCode"),
+		"zip": address.get("zip"),
+		"country": address.get("country"),
+		"country_code": address.get("countryCodeV2"),
+		"phone": address.get("phone"),
+		"latitude": address.get("latitude"),
+		"longitude": address.get("longitude"),
+	}
+
+
+def _map_payment_terms(terms: dict[str, Any] | None) -> dict[str, Any] | None:
+	if not terms:
+		return None
+	return {
+		"id": _gid_id(terms.get("id")),
+		"due_in_days": terms.get("dueInDays"),
+		"payment_terms_name": terms.get("paymentTermsName"),
+		"payment_terms_type": _lower(terms.get("paymentTermsType")),
+	}
+
+
+def _map_line_item(item: dict[str, Any]) -> dict[str, Any]:
+	product = item.get("product") or {}
+	return {
+		"id": _gid_id(item.get("id")),
+		"admin_graphql_api_id": item.get("id"),
+		"title": item.get("title"),
+		"name": item.get("name"),
+		"sku": item.get("sku"),
+		"vendor": item.get("vendor"),
+		"variant_title": item.get("variantTitle"),
+		"quantity": cint(item.get("quantity")),
+		"fulfillable_quantity": cint(item.get("unfulfilledQuantity")),
+		"requires_shipping": item.get("requiresShipping"),
+		"gift_card": item.get("isGiftCard"),
+		"taxable": item.get("taxable"),
+		"price": _money(item.get("originalUnitPriceSet")),
+		"price_set": _money_set(item.get("originalUnitPriceSet")),
+		"total_discount": _money(item.get("totalDiscountSet")),
+		"total_discount_set": _money_set(item.get("totalDiscountSet")),
+		"variant_id": cint((item.get("variant") or {}).get("legacyResourceId")) or None,
+		"product_id": cint(product.get("legacyResourceId")) or None,
+		# REST reports whether the product still exists; deleted products come back as ``null``.
+		"product_exists": bool(product.get("id")),
+		"properties": [
+			{"name": attribute.get("key"), "value": attribute.get("value")}
+			for attribute in item.get("customAttributes") or []
+		],
+		"tax_lines": [_map_tax_line(tax) for tax in item.get("taxLines") or []],
+		"discount_allocations": [
+			_map_discount_allocation(allocation) for allocation in item.get("discountAllocations") or []
+		],
+	}
+
+
+def _map_shipping_line(line: dict[str, Any]) -> dict[str, Any]:
+	return {
+		"id": _gid_id(line.get("id")),
+		"title": line.get("title"),
+		"code": line.get("code"),
+		"source": line.get("source"),
+		"phone": line.get("phone"),
+		"carrier_identifier": line.get("carrierIdentifier"),
+		"price": _money(line.get("originalPriceSet")),
+		"price_set": _money_set(line.get("originalPriceSet")),
+		"discounted_price": _money(line.get("discountedPriceSet")),
+		"discounted_price_set": _money_set(line.get("discountedPriceSet")),
+		"tax_lines": [_map_tax_line(tax) for tax in line.get("taxLines") or []],
+		"discount_allocations": [
+			_map_discount_allocation(allocation) for allocation in line.get("discountAllocations") or []
+		],
+	}
+
+
+def _map_tax_line(tax: dict[str, Any]) -> dict[str, Any]:
+	return {
+		"title": tax.get("title"),
+		"rate": tax.get("rate"),
+		"channel_liable": tax.get("channelLiable"),
+		"price": _money(tax.get("priceSet")),
+		"price_set": _money_set(tax.get("priceSet")),
+	}
+
+
+def _map_discount_allocation(allocation: dict[str, Any]) -> dict[str, Any]:
+	return {
+		"amount": _money(allocation.get("allocatedAmountSet")),
+		"amount_set": _money_set(allocation.get("allocatedAmountSet")),
+		"discount_application_index": cint((allocation.get("discountApplication") or {}).get("index")),
+	}
+
+
+def _money(value: dict[str, Any] | None, key: str = "shopMoney") -> str:
+	# REST amounts are strings with two decimals ("5.00"); GraphQL decimals drop trailing zeros.
+	amount = ((value or {}).get(key) or {}).get("amount")
+	return _format_amount(Decimal(amount) if amount not in (None, "") else Decimal(0))
+
+
+def _money_set(value: dict[str, Any] | None) -> dict[str, Any]:
+	return {
+		rest_key: {
+			"amount": _money(value, key),
+			"currency_code": ((value or {}).get(key) or {}).get("currencyCode"),
+		}
+		for key, rest_key in (("shopMoney", "shop_money"), ("presentmentMoney", "presentment_money"))
+	}
+
+
+def _format_amount(amount: Decimal) -> str:
+	return f"{amount:.2f}"
+
+
+def _timestamp(value: str | None, timezone: str | None) -> str | None:
+	if not value or not timezone:
+		return value
+	moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+	return moment.astimezone(ZoneInfo(timezone)).isoformat()
+
+
+def _lower(value: str | None) -> str | None:
+	return value.lower() if isinstance(value, str) else value
+
+
+def _gid_type(gid: str | None) -> str:
+	# gid://shopify/LineItem/123 -> LineItem
+	parts = (gid or "").split("/")
+	return parts[-2] if len(parts) >= 2 else ""
+
+
+def _gid_id(gid: str | None) -> int | None:
+	return cint((gid or "").rsplit("/", 1)[-1]) or None
@@ -1,26 +1,318 @@
 from __future__ import annotations
 
+import json
+from datetime import timedelta
+from typing import Any
+
 import frappe
+from frappe.utils import cint, cstr, get_datetime, now_datetime, time_diff_in_seconds
 
 from ecommerce_integrations.shopify import order as shopify_order
+from ecommerce_integrations.shopify.constants import EVENT_MAPPER, SETTING_DOCTYPE
+from ecommerce_integrations.shopify.utils import create_shopify_log
 from ecom_custom.shopify import order_overrides
 
+BACKFILL_DOCTYPE = "Shopify Backfill Window"
+DEFAULT_WINDOW_DAYS = 7
+BULK_OPERATION_JOB_TIMEOUT = 12 * 60 * 60
+# A busy window can take hours; progress is checkpointed per order, so a killed job loses nothing.
+WINDOW_JOB_TIMEOUT = 6 * 60 * 60
+# A window still "Running" this long after its job's timeout lost its job and is re-queued.
+STALLED_WINDOW_GRACE_SECONDS = 15 * 60
+
+
+def enqueue_old_orders_sync(
+	start: str | None = None,
+	end: str | None = None,
+	window_days: int = DEFAULT_WINDOW_DAYS,
+	workers: int = 1,
+) -> str:
+	"""Split the old-orders range into windows and sync them on ``workers`` parallel job chains.
+
+	Each chain claims the next queued window, so windows are sharded across the ``long``
+	workers; all of them share the Shopify API budget through :mod:`ecom_custom.shopify.rate_limit`.
+
+	Returns the backfill id, which can be passed to :func:`get_old_orders_sync_status` and
+	:func:`resume_old_orders_sync`.
+	"""
 
-def enqueue_old_orders_sync(start: str | None = None, end: str | None = None):
 	shopify_order.sync_sales_order = order_overrides.sync_sales_order
 	shopify_order._fetch_old_orders = order_overrides.fetch_old_orders_any
 
 	if start:
-		frappe.db.set_value("Shopify Setting", "Shopify Setting", "old_orders_from", start)
+		frappe.db.set_value(SETTING_DOCTYPE, SETTING_DOCTYPE, "old_orders_from", start)
 	if end:
-		frappe.db.set_value("Shopify Setting", "Shopify Setting", "old_orders_to", end)
+		frappe.db.set_value(SETTING_DOCTYPE, SETTING_DOCTYPE, "old_orders_to", end)
+
+	start = start or frappe.db.get_single_value(SETTING_DOCTYPE, "old_orders_from")
+	end = end or frappe.db.get_single_value(SETTING_DOCTYPE, "old_orders_to")
+	if not start or not end:
+		frappe.throw("Both a start and an end date are required to sync old orders")
+
+	backfill_id = frappe.generate_hash(length=10)
+	for window_from, window_to in _split_range(start, end, window_days):
+		frappe.get_doc(
+			{
+				"doctype": BACKFILL_DOCTYPE,
+				"backfill_id": backfill_id,
+				"window_from": window_from,
+				"window_to": window_to,
+				"status": "Queued",
+			}
+		).insert(ignore_permissions=True)
+
+	frappe.db.commit()
+
+	_enqueue_window_jobs(backfill_id, workers)
+	return backfill_id
+
+
+def resume_old_orders_sync(backfill_id: str, workers: int = 1) -> str:
+	"""Re-queue unfinished windows of a backfill; windows keep their cursor and resume mid-window."""
+
+	frappe.db.set_value(
+		BACKFILL_DOCTYPE,
+		{"backfill_id": backfill_id, "status": ["in", ["Running", "Failed"]]},
+		{"status": "Queued", "error": None},
+		update_modified=False,
+	)
+	frappe.db.commit()
+
+	_enqueue_window_jobs(backfill_id, workers)
+	return backfill_id
 
-	frappe.db.set_value("Shopify Setting", "Shopify Setting", "sync_old_orders", 1)
+
+def requeue_stalled_backfill_windows() -> int:
+	"""Scheduler entry point: re-queue windows whose job was killed and restart their chains.
+
+	A job killed at its timeout never marks its window, and the next window is only chained when
+	a job finishes, so without this the backfill would stall in "Running". Returns the number of
+	windows re-queued.
+	"""
+
+	cutoff = now_datetime() - timedelta(seconds=WINDOW_JOB_TIMEOUT + STALLED_WINDOW_GRACE_SECONDS)
+	stalled = frappe.get_all(
+		BACKFILL_DOCTYPE,
+		filters={"status": "Running", "started_at": ["<", cutoff]},
+		fields=["name", "backfill_id"],
+		limit=0,
+	)
+	if not stalled:
+		return 0
+
+	for window in stalled:
+		frappe.db.set_value(
+			BACKFILL_DOCTYPE,
+			window.name,
+			{"status": "Queued", "error": "Re-queued after its job exceeded the timeout"},
+			update_modified=False,
+		)
 	frappe.db.commit()
 
+	for backfill_id in {window.backfill_id for window in stalled}:
+		_enqueue_window_jobs(backfill_id)
+	return len(stalled)
+
+
+def get_old_orders_sync_status(backfill_id: str | None = None) -> dict[str, Any]:
+	"""Report progress, throughput and an ETA for a backfill (the latest one by default)."""
+
+	if not backfill_id:
+		backfill_id = frappe.db.get_value(BACKFILL_DOCTYPE, {}, "backfill_id", order_by="creation desc")
+		if not backfill_id:
+			return {}
+
+	windows = frappe.get_all(
+		BACKFILL_DOCTYPE,
+		filters={"backfill_id": backfill_id},
+		fields=["status", "orders_synced", "started_at", "completed_at"],
+		limit=0,
+	)
+
+	counts = {status: 0 for status in ("Queued", "Running", "Completed", "Failed")}
+	for window in windows:
+		counts[window.status] = counts.get(window.status, 0) + 1
+
+	orders_synced = sum(cint(window.orders_synced) for window in windows)
+	started = [get_datetime(window.started_at) for window in windows if window.started_at]
+	elapsed = time_diff_in_seconds(now_datetime(), min(started)) if started else 0
+
+	durations = [
+		time_diff_in_seconds(window.completed_at, window.started_at)
+		for window in windows
+		if window.status == "Completed" and window.started_at and window.completed_at
+	]
+	remaining = counts["Queued"] + counts["Running"] + counts["Failed"]
+	running = max(counts["Running"], 1)
+	eta = (sum(durations) / len(durations)) * remaining / running if durations else None
+
+	return {
+		"backfill_id": backfill_id,
+		"windows": len(windows),
+		**{status.lower(): count for status, count in counts.items()},
+		"orders_synced": orders_synced,
+		"elapsed_seconds": elapsed,
+		"orders_per_second": orders_synced / elapsed if elapsed else 0.0,
+		"eta_seconds": eta,
+	}
+
+
+def enqueue_bulk_operation_sync(start: str, end: str) -> None:
+	"""Import the orders created between ``start`` and ``end`` from one Shopify GraphQL bulk export.
+
+	An alternative to the windowed REST backfill for very large histories; the export is not
+	resumable, so a failed run is simply started again (already synced orders are skipped by
+	their payload fingerprint).
+	"""
+
 	frappe.enqueue(
-		shopify_order.sync_old_orders,
+		"ecom_custom.shopify.bulk_sync.sync_orders_from_bulk_operation",
 		queue="long",
-		job_name="Shopify Old Orders Sync",
+		timeout=BULK_OPERATION_JOB_TIMEOUT,
+		job_id=f"shopify_bulk_operation_sync::{start}::{end}",
+		deduplicate=True,
+		start=start,
+		end=end,
+	)
+
+
+def sync_orders_from_bulk_operation(start: str, end: str) -> int:
+	from ecom_custom.shopify.bulk_operations import iter_bulk_order_pages
+
+	synced = 0
+	for orders in iter_bulk_order_pages(start, end):
+		order_overrides.prime_sales_order_names([order.get("id") for order in orders])
+		for order in orders:
+			_sync_order(order)
+			synced += 1
+		frappe.db.commit()
+
+	return synced
+
+
+def sync_backfill_window(backfill_id: str) -> None:
+	"""Sync the next queued window of a backfill, then chain the job for the window after it.
+
+	Several chains may run side by side; windows are claimed with ``skip locked`` so each one is
+	processed by exactly one job.
+	"""
+
+	window = _claim_next_window(backfill_id)
+	if not window:
+		return
+
+	try:
+		_sync_window(window)
+	except Exception as exc:
+		frappe.db.rollback()
+		frappe.db.set_value(
+			BACKFILL_DOCTYPE, window, {"status": "Failed", "error": str(exc)}, update_modified=False
+		)
+		frappe.db.commit()
+		frappe.log_error(message=frappe.get_traceback(), title=f"Shopify backfill window {window} failed")
+	else:
+		frappe.db.set_value(
+			BACKFILL_DOCTYPE,
+			window,
+			{"status": "Completed", "completed_at": now_datetime()},
+			update_modified=False,
+		)
+		frappe.db.commit()
+
+	_enqueue_window_jobs(backfill_id)
+
+
+def _sync_window(window: str) -> None:
+	doc = frappe.get_doc(BACKFILL_DOCTYPE, window)
+
+	# When resuming, re-read the checkpointed page and skip up to the last order that finished.
+	# The first page has no cursor, so the order id alone marks the resume point.
+	skip_until = cstr(doc.last_order_id)
+	orders_synced = cint(doc.orders_synced)
+
+	pages = order_overrides.iter_order_pages_with_cursor(
+		doc.window_from, doc.window_to, page_info=doc.page_info or None
+	)
+	for page_info, orders in pages:
+		if skip_until:
+			page_ids = [cstr(order.get("id")) for order in orders]
+			if skip_until in page_ids:
+				orders = orders[page_ids.index(skip_until) + 1 :]
+			skip_until = ""
+
+		order_overrides.prime_sales_order_names([order.get("id") for order in orders])
+		for order in orders:
+			_sync_order(order)
+			orders_synced += 1
+			frappe.db.set_value(
+				BACKFILL_DOCTYPE,
+				window,
+				{
+					"page_info": page_info,
+					"last_order_id": str(order.get("id")),
+					"orders_synced": orders_synced,
+				},
+				update_modified=False,
+			)
+			frappe.db.commit()
+
+
+def _sync_order(order: dict[str, Any]) -> None:
+	# Mirrors ecommerce_integrations.shopify.order.sync_old_orders for a single payload.
+	try:
+		log = create_shopify_log(
+			method=EVENT_MAPPER["orders/create"], request_data=json.dumps(order), make_new=True
+		)
+		order_overrides.sync_sales_order(order, request_id=log.name)
+	except Exception as exc:
+		create_shopify_log(status="Error", exception=exc, rollback=True)
+
+
+def _claim_next_window(backfill_id: str) -> str | None:
+	names = frappe.db.sql(
+		f"""
+		select name from `tab{BACKFILL_DOCTYPE}`
+		where backfill_id = %s and status = 'Queued'
+		order by window_from
+		limit 1
+		for update skip locked
+		""",
+		backfill_id,
+		pluck=True,
+	)
+	if not names:
+		return None
+
+	frappe.db.set_value(
+		BACKFILL_DOCTYPE,
+		names[0],
+		{"status": "Running", "started_at": now_datetime(), "error": None},
+		update_modified=False,
 	)
-	return "enqueued"
+	frappe.db.commit()
+	return names[0]
+
+
+def _enqueue_window_jobs(backfill_id: str, workers: int = 1) -> None:
+	queued = frappe.db.count(BACKFILL_DOCTYPE, {"backfill_id": backfill_id, "status": "Queued"})
+
+	for _ in range(min(max(cint(workers), 1), queued)):
+		frappe.enqueue(
+			"ecom_custom.shopify.bulk_sync.sync_backfill_window",
+			queue="long",
+			timeout=WINDOW_JOB_TIMEOUT,
+			job_name=f"Shopify Old Orders Sync {backfill_id}",
+			backfill_id=backfill_id,
+		)
+
+
+def _split_range(start, end, window_days: int) -> list[tuple[Any, Any]]:
+	start, end = get_datetime(start), get_datetime(end)
+	step = timedelta(days=max(cint(window_days), 1))
+
+	windows = []
+	while start <= end:
+		window_end = min(start + step - timedelta(seconds=1), end)
+		windows.append((start, window_end))
+		start = window_end + timedelta(seconds=1)
+	return windows
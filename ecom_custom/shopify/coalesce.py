@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any
+
+import frappe
+from ecommerce_integrations.shopify.utils import create_shopify_log
+from frappe.utils import cint, cstr, get_datetime
+
+from ecom_custom.shopify import order_overrides
+
+DEFAULT_QUIET_SECONDS = 30
+# An order that keeps receiving updates is still processed once its oldest parked update is this old.
+MAX_WAIT_SECONDS = 5 * 60
+# How long the newest ``updated_at`` seen for an order is remembered, to drop late, older deliveries.
+STAMP_TTL = 60 * 60
+DRAIN_BATCH_SIZE = 100
+# Stop picking up parked orders after this long, well inside the scheduler job's timeout; the
+# rest waits for the next run.
+DRAIN_TIME_BUDGET_SECONDS = 4 * 60
+
+_PAYLOADS_KEY = "ecom_custom:shopify:coalesce:payloads"
+_REQUESTS_KEY = "ecom_custom:shopify:coalesce:requests"
+_FIRST_SEEN_KEY = "ecom_custom:shopify:coalesce:first_seen"
+_ARRIVALS_KEY = "ecom_custom:shopify:coalesce:arrivals"
+_STAMP_KEY = "ecom_custom:shopify:coalesce:stamp"
+
+# Park a payload unless a newer one (by ``updated_at``) has already been seen for the order.
+# Returns the request id of the webhook log that no longer needs processing, or "".
+_PARK_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[5]) or '-1')
+if tonumber(ARGV[2]) < current then
+	return ARGV[4]
+end
+
+local previous = redis.call('HGET', KEYS[2], ARGV[1]) or ''
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[4])
+redis.call('HSETNX', KEYS[3], ARGV[1], ARGV[5])
+redis.call('ZADD', KEYS[4], ARGV[5], ARGV[1])
+redis.call('SET', KEYS[5], ARGV[2], 'EX', ARGV[6])
+return previous
+"""
+
+# Read a parked payload if the order has been quiet since ARGV[2] or waited since ARGV[3]. The
+# payload stays parked until it is acknowledged, so a sync killed halfway is retried.
+_PEEK_SCRIPT = """
+local arrived = tonumber(redis.call('ZSCORE', KEYS[4], ARGV[1]) or '0')
+local first = tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or arrived)
+if arrived > tonumber(ARGV[2]) and first > tonumber(ARGV[3]) then
+	return false
+end
+
+return {redis.call('HGET', KEYS[1], ARGV[1]) or '', redis.call('HGET', KEYS[2], ARGV[1]) or ''}
+"""
+
+# Drop a processed payload, unless a newer one was parked for the order in the meantime.
+_ACK_SCRIPT = """
+if (redis.call('HGET', KEYS[1], ARGV[1]) or '') ~= ARGV[2] then
+	return 0
+end
+
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('ZREM', KEYS[4], ARGV[1])
+return 1
+"""
+
+
+def park_order_update(payload: dict[str, Any], request_id: str | None = None) -> None:
+	"""Handle an ``orders/updated`` webhook by parking it until the order has been quiet for a while.
+
+	Only the newest payload per order id is kept; the webhook log of any payload it replaces is
+	closed as superseded. :func:`process_coalesced_orders` syncs parked orders once no update has
+	arrived for ``shopify_webhook_quiet_seconds`` (site config, 0 disables coalescing).
+	"""
+
+	order = payload or {}
+	order_id = cstr(order.get("id"))
+	if not order_id or not _quiet_seconds():
+		order_overrides.sync_sales_order(payload, request_id)
+		return
+
+	superseded = frappe.cache.eval(
+		_PARK_SCRIPT,
+		5,
+		*_keys(order_id),
+		order_id,
+		_updated_at_stamp(order),
+		json.dumps(order),
+		request_id or "",
+		time.time(),
+		STAMP_TTL,
+	)
+	_mark_superseded(frappe.safe_decode(superseded))
+
+
+def process_coalesced_orders() -> int:
+	"""Sync every parked order that has been quiet long enough; returns the number processed.
+
+	A payload is only removed once its sync has committed (or failed and been logged), so a run
+	that is killed or times out leaves it parked for the next one.
+	"""
+
+	now = time.time()
+	quiet_cutoff = now - (_quiet_seconds() or DEFAULT_QUIET_SECONDS)
+	wait_cutoff = now - MAX_WAIT_SECONDS
+
+	# Raw commands: these structures are written by Lua, so their values are not pickled.
+	candidates = set(
+		frappe.cache.execute_command(
+			"ZRANGEBYSCORE",
+			frappe.cache.make_key(_ARRIVALS_KEY),
+			"-inf",
+			quiet_cutoff,
+			"LIMIT",
+			0,
+			DRAIN_BATCH_SIZE,
+		)
+		or []
+	)
+	first_seen = frappe.cache.execute_command("HGETALL", frappe.cache.make_key(_FIRST_SEEN_KEY)) or {}
+	for order_id, seen_at in first_seen.items():
+		if len(candidates) >= DRAIN_BATCH_SIZE:
+			break
+		if _first_seen_value(seen_at) <= wait_cutoff:
+			candidates.add(order_id)
+
+	order_ids = [frappe.safe_decode(order_id) for order_id in candidates]
+	order_overrides.prime_sales_order_names(order_ids)
+
+	processed = 0
+	for order_id in order_ids:
+		if time.time() - now > DRAIN_TIME_BUDGET_SECONDS:
+			break
+
+		parked = frappe.cache.eval(_PEEK_SCRIPT, 5, *_keys(order_id), order_id, quiet_cutoff, wait_cutoff)
+		if not parked:
+			continue
+
+		payload, request_id = (frappe.safe_decode(value) for value in parked)
+		if not payload:
+			continue
+
+		try:
+			order_overrides.sync_sales_order(json.loads(payload), request_id or None)
+		except Exception as exc:
+			# The failure is on the webhook log, from where it can be retried.
+			frappe.flags.request_id = request_id or None
+			create_shopify_log(status="Error", exception=exc, rollback=True)
+		else:
+			frappe.db.commit()
+			processed += 1
+
+		frappe.cache.eval(_ACK_SCRIPT, 4, *_keys(order_id)[:4], order_id, payload)
+
+	return processed
+
+
+def _mark_superseded(request_id: str | None) -> None:
+	if not request_id:
+		return
+
+	previous_request_id = frappe.flags.request_id
+	frappe.flags.request_id = request_id
+	try:
+		create_shopify_log(status="Success", message="Superseded by a newer orders/updated webhook")
+	finally:
+		frappe.flags.request_id = previous_request_id
+
+
+def _keys(order_id: str) -> tuple[str, ...]:
+	make_key = frappe.cache.make_key
+	return (
+		make_key(_PAYLOADS_KEY),
+		make_key(_REQUESTS_KEY),
+		make_key(_FIRST_SEEN_KEY),
+		make_key(_ARRIVALS_KEY),
+		make_key(f"{_STAMP_KEY}:{order_id}"),
+	)
+
+
+def _updated_at_stamp(order: dict[str, Any]) -> float:
+	updated_at = order.get("updated_at")
+	if not updated_at:
+		return time.time()
+	try:
+		return get_datetime(updated_at).timestamp()
+	except Exception:
+		return time.time()
+
+
+def _first_seen_value(value: Any) -> float:
+	try:
+		return float(frappe.safe_decode(value))
+	except (TypeError, ValueError):
+		return 0.0
+
+
+def _quiet_seconds() -> int:
+	value = frappe.conf.get("shopify_webhook_quiet_seconds")
+	return DEFAULT_QUIET_SECONDS if value is None else cint(value)
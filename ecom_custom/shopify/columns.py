@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import frappe
+
+
+def get_writable_columns(doctype: str) -> frozenset[str]:
+	"""Return fieldnames that exist both on the DocType meta and as columns of its table.
+
+	Results are kept on ``frappe.local``, i.e. for one request or background job. Meta and table
+	columns come from Frappe's own caches, which migrate clears, so long-running workers pick up
+	new custom fields with their next job.
+	"""
+
+	cache = _writable_columns()
+	columns = cache.get(doctype)
+	if columns is None:
+		meta = frappe.get_meta(doctype)
+		fieldnames = {df.fieldname for df in meta.fields if df.fieldname}
+		columns = frozenset(fieldnames & set(frappe.db.get_table_columns(doctype)))
+		cache[doctype] = columns
+	return columns
+
+
+def has_writable_column(doctype: str, fieldname: str) -> bool:
+	return fieldname in get_writable_columns(doctype)
+
+
+def clear_column_cache() -> None:
+	frappe.local.shopify_writable_columns = {}
+
+
+def _writable_columns() -> dict[str, frozenset[str]]:
+	if getattr(frappe.local, "shopify_writable_columns", None) is None:
+		frappe.local.shopify_writable_columns = {}
+	return frappe.local.shopify_writable_columns
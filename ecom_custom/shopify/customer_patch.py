@@ -1,11 +1,22 @@
 import frappe
 
+from ecom_custom.shopify.columns import has_writable_column
+
 # Placeholder used when Shopify does not provide a fiscal code.
 DEFAULT_FISCAL_CODE = "0000000000000000"
 
 
+def fiscal_code_updates(customer_doc) -> dict:
+	"""Return the placeholder fiscal code update for ``customer_doc`` if it lacks one."""
+
+	if not has_writable_column("Customer", "fiscal_code") or customer_doc.get("fiscal_code"):
+		return {}
+
+	return {"fiscal_code": DEFAULT_FISCAL_CODE}
+
+
 def _ensure_fiscal_code(self):
-	if not frappe.db.has_column("Customer", "fiscal_code"):
+	if not has_writable_column("Customer", "fiscal_code"):
 		return
 
 	try:
@@ -13,10 +24,11 @@ def _ensure_fiscal_code(self):
 	except frappe.DoesNotExistError:
 		return
 
-	if customer_doc.fiscal_code:
+	updates = fiscal_code_updates(customer_doc)
+	if not updates:
 		return
 
-	customer_doc.fiscal_code = DEFAULT_FISCAL_CODE
+	customer_doc.update(updates)
 	customer_doc.flags.ignore_mandatory = True
 	customer_doc.save(ignore_permissions=True)
 
@@ -24,7 +36,9 @@ def _ensure_fiscal_code(self):
 def _wrap_and_ensure(method):
 	def wrapped(self, *args, **kwargs):
 		result = method(self, *args, **kwargs)
-		_ensure_fiscal_code(self)
+		# The order pipeline applies the fiscal code itself as part of its single customer save.
+		if not frappe.flags.defer_shopify_fiscal_code:
+			_ensure_fiscal_code(self)
 		return result
 
 	return wrapped
@@ -1,22 +1,53 @@
 import frappe
+from ecommerce_integrations.shopify.constants import CUSTOMER_ID_FIELD
+
+from ecom_custom.shopify.columns import has_writable_column
 
 DEFAULT_FISCAL_CODE = "0000000000000000"
 
 
 def ensure_customer_fiscal_code(doc, method=None):
-	"""Set a placeholder fiscal code on Sales Invoice to satisfy Italy validation."""
+	"""Set a placeholder fiscal code on Sales Invoice to satisfy Italy validation.
+
+	Only the invoice is touched: Shopify customers get their placeholder from
+	:func:`backfill_customer_fiscal_codes` and the customer sync, so no Customer row is written
+	(or locked) inside the invoice transaction.
+	"""
 
-	if not doc.customer or not frappe.db.has_column("Customer", "fiscal_code"):
+	if not doc.customer or not has_writable_column("Customer", "fiscal_code"):
 		return
 
-	# Fetch current fiscal code
-	fiscal_code = frappe.db.get_value("Customer", doc.customer, "fiscal_code") or ""
+	fiscal_code = frappe.get_cached_value("Customer", doc.customer, "fiscal_code") or ""
 	fiscal_code = fiscal_code.strip() if isinstance(fiscal_code, str) else fiscal_code
 
-	if not fiscal_code:
-		fiscal_code = DEFAULT_FISCAL_CODE
-		frappe.db.set_value("Customer", doc.customer, "fiscal_code", fiscal_code)
-
 	# Ensure the invoice carries the value
 	if hasattr(doc, "customer_fiscal_code"):
-		doc.customer_fiscal_code = fiscal_code
+		doc.customer_fiscal_code = fiscal_code or DEFAULT_FISCAL_CODE
+
+
+def backfill_customer_fiscal_codes() -> int:
+	"""Give every Shopify customer without a fiscal code the placeholder, in one UPDATE.
+
+	Returns the number of customers updated. Safe to run repeatedly.
+	"""
+
+	if not has_writable_column("Customer", "fiscal_code") or not has_writable_column(
+		"Customer", CUSTOMER_ID_FIELD
+	):
+		return 0
+
+	condition = f"coalesce(`{CUSTOMER_ID_FIELD}`, '') != '' and coalesce(trim(fiscal_code), '') = ''"
+	names = frappe.db.sql(f"select name from `tabCustomer` where {condition}", pluck=True)
+	if not names:
+		return 0
+
+	frappe.db.sql(
+		f"update `tabCustomer` set fiscal_code = %(fiscal_code)s where {condition}",
+		{"fiscal_code": DEFAULT_FISCAL_CODE},
+	)
+
+	# The UPDATE bypasses the ORM, so drop cached copies read by ``get_cached_value``.
+	for name in names:
+		frappe.clear_document_cache("Customer", name)
+
+	return len(names)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import functools
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import frappe
+from frappe.utils import cint, flt
+
+METRICS_KEY = "ecom_custom:shopify:instrumentation"
+WINDOW_SECONDS = 5 * 60
+RETENTION_SECONDS = 24 * 60 * 60
+
+# Histogram upper bounds; the last bucket is open-ended.
+BUCKETS = {
+	"ms": (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000),
+	"queries": (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+	"http_calls": (0, 1, 2, 3, 5, 10, 20),
+}
+
+_local = threading.local()
+_install_lock = threading.Lock()
+
+# Plain HINCRBYFLOAT through Lua: frappe's RedisWrapper pickles values written via ``hset``.
+_INCREMENT_SCRIPT = """
+for i = 1, #ARGV - 1, 2 do
+	redis.call('HINCRBYFLOAT', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[#ARGV])
+return 1
+"""
+
+
+@contextmanager
+def capture() -> Iterator[dict[str, float]]:
+	"""Measure wall time, SQL queries and Shopify HTTP calls of the enclosed block.
+
+	The yielded dict is filled in when the block exits. Captures may be nested; each one counts
+	everything issued inside it by the current thread, so concurrent jobs never see each other's
+	calls (nor those of helper threads they start).
+	"""
+
+	_install_counters()
+
+	metrics = {"ms": 0.0, "queries": 0, "http_calls": 0}
+	captures = _active_captures()
+	captures.append(metrics)
+	started = time.perf_counter()
+	try:
+		yield metrics
+	finally:
+		metrics["ms"] = (time.perf_counter() - started) * 1000
+		captures[:] = [active for active in captures if active is not metrics]
+
+
+def _active_captures() -> list[dict[str, float]]:
+	if not hasattr(_local, "captures"):
+		_local.captures = []
+	return _local.captures
+
+
+def _install_counters() -> None:
+	"""Wrap the SQL and Shopify HTTP entry points once per process with thread-local counters."""
+
+	import shopify
+	from shopify.base import ShopifyConnection
+
+	targets = (
+		(type(frappe.db), "sql", "queries"),
+		(ShopifyConnection, "_open", "http_calls"),
+		(shopify.GraphQL, "execute", "http_calls"),
+	)
+	with _install_lock:
+		for owner, attribute, metric in targets:
+			func = getattr(owner, attribute)
+			if not getattr(func, "_ecom_custom_counted", False):
+				setattr(owner, attribute, _counting(metric, func))
+
+
+def _counting(metric: str, func):
+	@functools.wraps(func)
+	def wrapper(*args, **kwargs):
+		for metrics in getattr(_local, "captures", ()):
+			metrics[metric] += 1
+		return func(*args, **kwargs)
+
+	wrapper._ecom_custom_counted = True
+	return wrapper
+
+
+@contextmanager
+def order() -> Iterator[None]:
+	"""Instrument one order, if it is picked by ``shopify_instrumentation_sample_rate``.
+
+	Stages recorded with :func:`stage` while the order is processed are added, together with a
+	``total`` stage, to the rolling histograms read by :func:`get_order_sync_metrics`.
+	"""
+
+	if getattr(frappe.local, "shopify_instrumentation", None) is not None or not _is_sampled():
+		yield
+		return
+
+	frappe.local.shopify_instrumentation = stages = {}
+	try:
+		with capture() as total:
+			yield
+		stages["total"] = total
+		_record(stages)
+	finally:
+		frappe.local.shopify_instrumentation = None
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+	"""Record the enclosed block as stage ``name`` of the order being instrumented, if any."""
+
+	stages = getattr(frappe.local, "shopify_instrumentation", None)
+	if stages is None:
+		yield
+		return
+
+	with capture() as metrics:
+		yield
+
+	current = stages.setdefault(name, {metric: 0 for metric in BUCKETS})
+	for metric in BUCKETS:
+		current[metric] += metrics[metric]
+
+
+@frappe.whitelist()
+def get_order_sync_metrics(minutes: int = 60) -> dict[str, Any]:
+	"""Summarise the sampled per-stage metrics of the last ``minutes``.
+
+	Percentiles are histogram bucket upper bounds, so they are estimates.
+	"""
+
+	frappe.only_for("System Manager")
+
+	now = int(time.time())
+	windows = range(now - cint(minutes) * 60, now + 1, WINDOW_SECONDS)
+
+	totals: dict[str, float] = {}
+	for window in {_window_key(moment) for moment in windows} | {_window_key(now)}:
+		raw = frappe.cache.execute_command("HGETALL", frappe.cache.make_key(window)) or {}
+		for field, value in raw.items():
+			field = frappe.safe_decode(field)
+			totals[field] = totals.get(field, 0.0) + flt(frappe.safe_decode(value))
+
+	stages: dict[str, dict[str, Any]] = {}
+	for field, value in totals.items():
+		name, metric, part = field.split("|")
+		stages.setdefault(name, {"count": 0})
+		if metric == "count":
+			stages[name]["count"] = int(value)
+			continue
+		stages[name].setdefault(metric, {"sum": 0.0, "histogram": {}})
+		if part == "sum":
+			stages[name][metric]["sum"] = value
+		else:
+			stages[name][metric]["histogram"][part] = int(value)
+
+	for summary in stages.values():
+		count = summary["count"]
+		for metric in BUCKETS:
+			if metric not in summary:
+				continue
+			values = summary[metric]
+			values["mean"] = values.pop("sum") / count if count else 0.0
+			values["p50"] = _percentile(values["histogram"], metric, count, 0.5)
+			values["p95"] = _percentile(values["histogram"], metric, count, 0.95)
+
+	return {
+		"sample_rate": _sample_rate(),
+		"minutes": cint(minutes),
+		"stages": stages,
+	}
+
+
+def _record(stages: dict[str, dict[str, float]]) -> None:
+	args: list[Any] = []
+	for name, metrics in stages.items():
+		args += [f"{name}|count|", 1]
+		for metric, value in metrics.items():
+			args += [f"{name}|{metric}|sum", value, f"{name}|{metric}|{_bucket_label(metric, value)}", 1]
+
+	try:
+		frappe.cache.eval(
+			_INCREMENT_SCRIPT,
+			1,
+			frappe.cache.make_key(_window_key(time.time())),
+			*args,
+			RETENTION_SECONDS,
+		)
+	except Exception:
+		# Metrics must never break an order sync.
+		frappe.logger("ecom_custom.instrumentation").warning("Could not record order sync metrics")
+
+
+def _bucket_label(metric: str, value: float) -> str:
+	for bound in BUCKETS[metric]:
+		if value <= bound:
+			return f"le_{bound}"
+	return "inf"
+
+
+def _percentile(histogram: dict[str, int], metric: str, count: int, quantile: float) -> float | None:
+	if not count:
+		return None
+
+	seen = 0
+	for label in [f"le_{bound}" for bound in BUCKETS[metric]] + ["inf"]:
+		seen += histogram.get(label, 0)
+		if seen >= quantile * count:
+			# ``None`` means "above the largest bucket".
+			return float(label[3:]) if label != "inf" else None
+	return None
+
+
+def _window_key(moment: float) -> str:
+	return f"{METRICS_KEY}:{int(moment) // WINDOW_SECONDS}"
+
+
+def _sample_rate() -> float:
+	return min(max(flt(frappe.conf.get("shopify_instrumentation_sample_rate")), 0.0), 1.0)
+
+
+def _is_sampled() -> bool:
+	rate = _sample_rate()
+	return rate > 0 and (rate >= 1 or random.random() < rate)
@@ -5,6 +5,7 @@ from shopify.resources import Order
 
 from ecommerce_integrations.shopify.connection import temp_shopify_session
 from ecom_custom.shopify import order_overrides
+from ecom_custom.shopify.rate_limit import throttled
 
 
 def import_order(order_id: int | str) -> str | None:
@@ -19,6 +20,7 @@ def import_order(order_id: int | str) -> str | None:
 
 
 @temp_shopify_session
+@throttled
 def _fetch_order_payload(order_id: int | str) -> dict | None:
 	order = Order.find(order_id)
 	return order.to_dict() if order else None
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import json
+from collections.abc import Iterator
 from typing import Any
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
 
 import frappe
 from frappe.utils import cint, cstr, flt, now_datetime
@@ -9,12 +13,57 @@ from ecommerce_integrations.shopify.connection import temp_shopify_session
 from frappe.utils.nestedset import get_root_of
 
 from ecommerce_integrations.shopify import order as shopify_order_module
-from ecommerce_integrations.shopify.constants import ORDER_ID_FIELD, ORDER_NUMBER_FIELD, ORDER_STATUS_FIELD, SETTING_DOCTYPE
+from ecommerce_integrations.shopify.constants import (
+	ORDER_ID_FIELD,
+	ORDER_NUMBER_FIELD,
+	ORDER_STATUS_FIELD,
+	SETTING_DOCTYPE,
+)
 from ecommerce_integrations.shopify.customer import ShopifyCustomer
 from ecommerce_integrations.shopify.utils import create_shopify_log
+from ecom_custom.shopify import customer_patch
+from ecom_custom.shopify import instrumentation
+from ecom_custom.shopify.columns import get_writable_columns
+from ecom_custom.shopify.rate_limit import throttled
 
 _BASE_SYNC_SALES_ORDER = shopify_order_module.sync_sales_order
 
+FULFILLMENT_FIELDS = ("per_delivered", "status", "docstatus")
+SKIPPED_ADDRESS_SAVES_KEY = "ecom_custom:shopify:skipped_address_saves"
+TERRITORY_CACHE_KEY = "ecom_custom:shopify:territories"
+TERRITORY_FAILURE_TTL = 60 * 60
+
+PAYLOAD_HASH_FIELD = "shopify_payload_hash"
+
+# Part of every fingerprint: bump it when the payload-to-Sales-Order mapping changes, so each
+# order is re-applied once on its next sync instead of being skipped as unchanged.
+FINGERPRINT_VERSION = 2
+
+# Top-level payload keys that feed the post-processing pipeline; changes elsewhere (tags, notes,
+# ``updated_at`` itself) do not affect the Sales Order and should not trigger a re-sync.
+FINGERPRINT_KEYS = (
+	"name",
+	"email",
+	"financial_status",
+	"fulfillment_status",
+	"closed_at",
+	"cancel_reason",
+	"shipping_address",
+	"billing_address",
+	"discount_codes",
+	"payment_gateway_names",
+	"shipping_lines",
+	"payment_terms",
+)
+
+# Nested objects reduced to the fields the pipeline reads: their other fields differ between the
+# REST payload and the bulk operation (GraphQL) payload of the same order.
+FINGERPRINT_PROJECTIONS = {
+	"customer": ("id", "first_name", "last_name", "email"),
+	"shipping_lines": ("title", "code"),
+	"payment_terms": ("payment_terms_name", "payment_terms_type"),
+}
+
 
 def sync_sales_order(payload: dict[str, Any], request_id: str | None = None) -> None:
 	"""Extend the default behaviour so we can re-sync existing orders.
@@ -24,51 +73,284 @@ def sync_sales_order(payload: dict[str, Any], request_id: str | None = None) ->
 	"""
 
 	order = payload or {}
-	order_id = cstr(order.get("id"))
 
 	frappe.set_user("Administrator")
 	frappe.flags.request_id = request_id
 
-	sales_order = frappe.db.get_value("Sales Order", {ORDER_ID_FIELD: order_id})
+	with instrumentation.order():
+		_sync_sales_order(order, payload, request_id)
+
+
+def _sync_sales_order(order: dict[str, Any], payload: dict[str, Any], request_id: str | None) -> None:
+	order_id = cstr(order.get("id"))
+
+	sales_order = _get_sales_order_name(order_id)
 	if not sales_order:
-		_BASE_SYNC_SALES_ORDER(payload, request_id)
-		sales_order = frappe.db.get_value("Sales Order", {ORDER_ID_FIELD: order_id})
+		with instrumentation.stage("create"):
+			_BASE_SYNC_SALES_ORDER(payload, request_id)
+		sales_order = _get_sales_order_name(order_id, refresh=True)
 		if sales_order:
 			_post_process_sales_order(order, sales_order)
 		return
 
 	try:
-		_post_process_sales_order(order, sales_order)
+		updated = _post_process_sales_order(order, sales_order)
 	except Exception as exc:  # pragma: no cover
 		create_shopify_log(status="Error", exception=exc, rollback=True)
 	else:
-		create_shopify_log(status="Success", message=f"Sales Order {sales_order} updated from Shopify payload")
+		if updated:
+			message = f"Sales Order {sales_order} updated from Shopify payload"
+		else:
+			message = f"Sales Order {sales_order} already matches the Shopify payload"
+		create_shopify_log(status="Success", message=message)
+
+
+def sync_sales_orders(payloads: list[dict[str, Any]], request_id: str | None = None) -> None:
+	"""Sync a batch of Shopify payloads, resolving their Sales Orders with a single query."""
+
+	prime_sales_order_names([payload.get("id") for payload in payloads if payload])
+	for payload in payloads:
+		sync_sales_order(payload, request_id)
+
+
+def prime_sales_order_names(order_ids: list[str | int]) -> None:
+	"""Resolve Shopify order ids to Sales Order names in one ``IN (...)`` query.
+
+	Results (including misses) are remembered for the rest of the job, so subsequent
+	:func:`sync_sales_order` calls for these ids do not query again.
+	"""
+
+	cache = _sales_order_names()
+	pending = {cstr(order_id) for order_id in order_ids if order_id} - cache.keys()
+	if not pending:
+		return
+
+	rows = frappe.get_all(
+		"Sales Order",
+		filters={ORDER_ID_FIELD: ["in", list(pending)]},
+		fields=["name", "docstatus", ORDER_ID_FIELD, PAYLOAD_HASH_FIELD],
+	)
+	for order_id in pending:
+		cache[order_id] = None
+	for row in rows:
+		order_id = cstr(row.get(ORDER_ID_FIELD))
+		if not cache[order_id]:
+			cache[order_id] = row.name
+			_remember_sync_state(row)
+
+
+def _get_sales_order_name(order_id: str, refresh: bool = False) -> str | None:
+	cache = _sales_order_names()
+	if refresh or order_id not in cache:
+		row = frappe.db.get_value(
+			"Sales Order",
+			{ORDER_ID_FIELD: order_id},
+			["name", "docstatus", PAYLOAD_HASH_FIELD],
+			as_dict=True,
+		)
+		cache[order_id] = row.name if row else None
+		if row:
+			_remember_sync_state(row)
+	return cache[order_id]
+
+
+def _get_sync_state(sales_order: str) -> tuple[str | None, int]:
+	"""Return the stored payload hash and the current docstatus of ``sales_order``."""
+
+	hashes = _payload_hashes()
+	if sales_order not in hashes:
+		row = frappe.db.get_value(
+			"Sales Order", sales_order, ["name", "docstatus", PAYLOAD_HASH_FIELD], as_dict=True
+		)
+		if not row:
+			return None, 0
+		_remember_sync_state(row)
+	return hashes[sales_order], _docstatuses().get(sales_order, 0)
 
 
-def _post_process_sales_order(order: dict[str, Any], sales_order: str) -> None:
-	_ensure_customer_addresses(order)
-	_apply_updates(sales_order, order)
+def _remember_sync_state(row) -> None:
+	_payload_hashes()[row.name] = row.get(PAYLOAD_HASH_FIELD)
+	_docstatuses()[row.name] = cint(row.get("docstatus"))
+
+
+def _sales_order_names() -> dict[str, str | None]:
+	# ``frappe.local`` is reset for every request and background job, which scopes this map to one job.
+	if getattr(frappe.local, "shopify_sales_order_names", None) is None:
+		frappe.local.shopify_sales_order_names = {}
+	return frappe.local.shopify_sales_order_names
+
+
+def _payload_hashes() -> dict[str, str | None]:
+	if getattr(frappe.local, "shopify_payload_hashes", None) is None:
+		frappe.local.shopify_payload_hashes = {}
+	return frappe.local.shopify_payload_hashes
+
+
+def _docstatuses() -> dict[str, int]:
+	if getattr(frappe.local, "shopify_sales_order_docstatus", None) is None:
+		frappe.local.shopify_sales_order_docstatus = {}
+	return frappe.local.shopify_sales_order_docstatus
+
+
+def _post_process_sales_order(order: dict[str, Any], sales_order: str, force: bool = False) -> bool:
+	"""Apply the Shopify payload to an existing Sales Order.
+
+	Returns ``False`` without touching anything when the payload fingerprint matches the one
+	stored by the previous sync (e.g. duplicate ``orders/updated`` webhooks), unless ``force``.
+	The fingerprint also covers the Sales Order's docstatus and ``FINGERPRINT_VERSION``, so a
+	draft submitted since the last sync, or a changed mapping, is applied again.
+	"""
+
+	stored_hash, docstatus = _get_sync_state(sales_order)
+	fingerprint = _payload_fingerprint(order, docstatus)
+	if not force and fingerprint == stored_hash:
+		return False
+
+	with instrumentation.stage("customer"):
+		_ensure_customer_addresses(order)
+	with instrumentation.stage("updates"):
+		_apply_updates(sales_order, order, payload_hash=fingerprint)
+	_payload_hashes()[sales_order] = fingerprint
+	return True
+
+
+def _payload_fingerprint(order: dict[str, Any], docstatus: int = 0) -> str:
+	subset = {key: order.get(key) for key in FINGERPRINT_KEYS}
+	subset["_version"] = FINGERPRINT_VERSION
+	subset["_docstatus"] = cint(docstatus)
+	for key, fields in FINGERPRINT_PROJECTIONS.items():
+		value = order.get(key)
+		if isinstance(value, dict):
+			subset[key] = {field: value.get(field) for field in fields}
+		elif isinstance(value, list):
+			subset[key] = [
+				{field: row.get(field) for field in fields} for row in value if isinstance(row, dict)
+			]
+
+	return hashlib.sha256(json.dumps(subset, sort_keys=True, default=str).encode()).hexdigest()
+
+
+ORDER_PAGE_SIZE = 250
+
+
+def fetch_old_orders_any(
+	from_time, to_time, fields: str | list[str] | None = None
+) -> Iterator[dict[str, Any]]:
+	"""Yield every Shopify order (any status) created between ``from_time`` and ``to_time``.
+
+	Orders are streamed page by page so callers can start syncing while later pages are still
+	being downloaded; at most one page is held in memory.
+	"""
+
+	for orders in iter_order_pages(from_time, to_time, fields=fields):
+		yield from orders
+
+
+def iter_order_pages(
+	from_time, to_time, fields: str | list[str] | None = None
+) -> Iterator[list[dict[str, Any]]]:
+	"""Yield pages of Shopify order payloads created between ``from_time`` and ``to_time``.
+
+	``fields`` restricts the payload to the given top-level keys (Shopify's ``fields=`` projection).
+	"""
+
+	for _cursor, orders in iter_order_pages_with_cursor(from_time, to_time, fields=fields):
+		yield orders
+
+
+def iter_order_pages_with_cursor(
+	from_time, to_time, fields: str | list[str] | None = None, page_info: str | None = None
+) -> Iterator[tuple[str | None, list[dict[str, Any]]]]:
+	"""Like :func:`iter_order_pages`, but also yield the ``page_info`` cursor that fetched each page.
+
+	Passing a previously yielded cursor as ``page_info`` resumes the walk at that page.
+	"""
+
+	params: dict[str, Any] = {
+		"created_at_min": to_shopify_datetime(from_time),
+		"created_at_max": to_shopify_datetime(to_time),
+		"status": "any",
+	}
+	yield from _iter_pages(params, fields=fields, page_info=page_info)
+
+
+def iter_updated_order_pages(
+	updated_since, updated_until, fields: str | list[str] | None = None
+) -> Iterator[list[dict[str, Any]]]:
+	"""Yield pages of Shopify order payloads updated between ``updated_since`` and ``updated_until``."""
+
+	params: dict[str, Any] = {
+		"updated_at_min": to_shopify_datetime(updated_since),
+		"updated_at_max": to_shopify_datetime(updated_until),
+		"status": "any",
+	}
+	for _cursor, orders in _iter_pages(params, fields=fields):
+		yield orders
+
+
+def to_shopify_datetime(value) -> str:
+	"""Serialise ``value`` as an ISO 8601 timestamp with an explicit offset for Shopify filters.
+
+	Naive datetimes (``now_datetime()``, stored Datetime fields) are in the site's system
+	timezone, which need not match the worker's OS timezone, so it is attached explicitly.
+	"""
+
+	from frappe.utils import get_datetime, get_system_timezone
+
+	moment = get_datetime(value)
+	if moment.tzinfo is None:
+		moment = moment.replace(tzinfo=ZoneInfo(get_system_timezone()))
+	return moment.isoformat()
+
+
+def _iter_pages(
+	params: dict[str, Any], fields: str | list[str] | None = None, page_info: str | None = None
+) -> Iterator[tuple[str | None, list[dict[str, Any]]]]:
+	if isinstance(fields, (list, tuple, set)):
+		fields = ",".join(fields)
+
+	while True:
+		# Shopify rejects filters alongside ``page_info``; the cursor already encodes them.
+		query = {"page_info": page_info} if page_info else dict(params)
+		query["limit"] = ORDER_PAGE_SIZE
+		if fields:
+			query["fields"] = fields
+
+		orders, next_page_info = _fetch_orders_page(query)
+		if orders:
+			yield page_info, orders
+
+		if not next_page_info:
+			return
+		page_info = next_page_info
+
+
+def _fetch_orders_page(query: dict[str, Any]) -> tuple[list[dict[str, Any]], str | None]:
+	# Each page opens its own short-lived session: a generator cannot keep the decorator's
+	# session alive while the caller is consuming it.
+	return _find_orders(query) or ([], None)
 
 
 @temp_shopify_session
-def fetch_old_orders_any(from_time, to_time):
-	from frappe.utils import get_datetime
-	from shopify.collection import PaginatedIterator
+@throttled
+def _find_orders(query: dict[str, Any]) -> tuple[list[dict[str, Any]], str | None]:
 	from shopify.resources import Order
 
-	from_time = get_datetime(from_time).astimezone().isoformat()
-	to_time = get_datetime(to_time).astimezone().isoformat()
+	collection = Order.find(**query)
+	orders = [order.to_dict() for order in collection]
 
-	orders_iterator = PaginatedIterator(
-		Order.find(created_at_min=from_time, created_at_max=to_time, limit=250, status="any")
-	)
+	next_page_info = None
+	if collection.has_next_page():
+		next_page_info = _page_info_from_url(collection.next_page_url)
 
-	results = []
-	for orders in orders_iterator:
-		for order in orders:
-			results.append(order.to_dict())
+	return orders, next_page_info
 
-	return results
+
+def _page_info_from_url(url: str | None) -> str | None:
+	if not url:
+		return None
+	values = parse_qs(urlparse(url).query).get("page_info")
+	return values[0] if values else None
 
 
 shopify_order_module.sync_sales_order = sync_sales_order
@@ -92,18 +374,76 @@ def _ensure_customer_addresses(order: dict[str, Any]) -> None:
 	)
 
 	customer = ShopifyCustomer(customer_id=customer_id)
-	if not customer.is_synced():
-		customer.sync_customer(customer=shopify_customer)
-	else:
-		customer.update_existing_addresses(shopify_customer)
 
-	_apply_customer_metadata(customer, shopify_customer, order)
-	_refresh_address_docs(customer, shopify_customer, order)
-	_update_customer_territory(customer, order)
+	# The fiscal code placeholder is folded into the single customer save below.
+	frappe.flags.defer_shopify_fiscal_code = True
+	try:
+		if not customer.is_synced():
+			customer.sync_customer(customer=shopify_customer)
+		else:
+			customer.update_existing_addresses(shopify_customer)
+	finally:
+		frappe.flags.defer_shopify_fiscal_code = False
+
+	try:
+		customer_doc = customer.get_customer_doc()
+	except frappe.DoesNotExistError:
+		return
+
+	_update_customer_doc(customer_doc, shopify_customer, order)
+	_refresh_address_docs(customer_doc, shopify_customer, order)
+
+
+def _update_customer_doc(customer_doc, shopify_customer: dict[str, Any], order: dict[str, Any]) -> None:
+	"""Apply names, email, territory and fiscal code to an already loaded Customer, saving at most once."""
+
+	updates: dict[str, Any] = {}
+	updates.update(_customer_metadata_updates(customer_doc, shopify_customer, order))
+	updates.update(_customer_territory_updates(customer_doc, order))
+	updates.update(customer_patch.fiscal_code_updates(customer_doc))
+
+	if updates:
+		customer_doc.update(updates)
+		customer_doc.flags.ignore_mandatory = True
+		customer_doc.save(ignore_permissions=True)
+
 
+def _apply_updates(sales_order: str, order: dict[str, Any], payload_hash: str | None = None) -> None:
+	"""Write snapshot and fulfillment fields with a single read and at most one UPDATE.
+
+	Only columns whose stored value differs are written; ``shopify_last_synced_at`` is stamped
+	alongside them and nothing is written when the row already matches the payload.
+	"""
+
+	columns = get_writable_columns("Sales Order")
+	updates = {
+		field: value for field, value in _snapshot_updates(order, payload_hash).items() if field in columns
+	}
+
+	current = frappe.db.get_value(
+		"Sales Order",
+		sales_order,
+		[*updates, *(field for field in FULFILLMENT_FIELDS if field not in updates)],
+		as_dict=True,
+	)
+	if not current:
+		return
+
+	updates.update(_fulfillment_updates(sales_order, order, current))
+
+	changed = {field: value for field, value in updates.items() if _value_differs(current.get(field), value)}
+	if not changed:
+		return
+
+	changed["shopify_last_synced_at"] = now_datetime()
+	_set_existing_fields("Sales Order", sales_order, changed)
+
+
+def _snapshot_updates(order: dict[str, Any], payload_hash: str | None) -> dict[str, Any]:
+	updates: dict[str, Any] = {}
 
-def _apply_updates(sales_order: str, order: dict[str, Any]) -> None:
-	updates: dict[str, Any] = {"shopify_last_synced_at": now_datetime()}
+	if payload_hash:
+		updates[PAYLOAD_HASH_FIELD] = payload_hash
 
 	if order.get("name"):
 		updates[ORDER_NUMBER_FIELD] = order["name"]
@@ -114,8 +454,12 @@ def _apply_updates(sales_order: str, order: dict[str, Any]) -> None:
 	if "cancel_reason" in order:
 		updates["shopify_cancel_reason"] = order.get("cancel_reason")
 
-	shipping_snapshot = _address_snapshot(order.get("shipping_address"), prefix="shipping", default_email=order.get("email"))
-	billing_snapshot = _address_snapshot(order.get("billing_address"), prefix="billing", default_email=order.get("email"))
+	shipping_snapshot = _address_snapshot(
+		order.get("shipping_address"), prefix="shipping", default_email=order.get("email")
+	)
+	billing_snapshot = _address_snapshot(
+		order.get("billing_address"), prefix="billing", default_email=order.get("email")
+	)
 
 	if shipping_snapshot:
 		updates.update(shipping_snapshot)
@@ -131,13 +475,18 @@ def _apply_updates(sales_order: str, order: dict[str, Any]) -> None:
 	if payment_snapshot:
 		updates.update(payment_snapshot)
 
-	if updates:
-		_set_existing_fields("Sales Order", sales_order, updates)
+	return updates
 
-	_mark_order_fulfillment_status(sales_order, order)
 
+def _value_differs(current: Any, new: Any) -> bool:
+	if isinstance(new, (int, float)) or isinstance(current, (int, float)):
+		return flt(current) != flt(new)
+	return cstr(current) != cstr(new)
 
-def _address_snapshot(address: dict[str, Any] | None, *, prefix: str, default_email: str | None) -> dict[str, Any]:
+
+def _address_snapshot(
+	address: dict[str, Any] | None, *, prefix: str, default_email: str | None
+) -> dict[str, Any]:
 	if not isinstance(address, dict):
 		return {}
 
@@ -198,37 +547,29 @@ def _payment_snapshot(order: dict[str, Any]) -> dict[str, Any]:
 	}
 
 
-def _mark_order_fulfillment_status(sales_order: str, order: dict[str, Any]) -> None:
-	doc = frappe.db.get_value(
-		"Sales Order",
-		sales_order,
-		["per_delivered", "status", "docstatus"],
-		as_dict=True,
-	)
-
-	if not doc or doc.docstatus != 1:
-		return
+def _fulfillment_updates(sales_order: str, order: dict[str, Any], doc: dict[str, Any]) -> dict[str, Any]:
+	if doc.docstatus != 1:
+		return {}
 
-	is_fulfilled = _is_fulfilled(order)
 	values = {}
-	if is_fulfilled:
+	if _is_fulfilled(order):
 		if doc.per_delivered is None or doc.per_delivered < 100:
 			values["per_delivered"] = 100
 
 		if doc.status != "Completed":
 			values["status"] = "Completed"
 	else:
-		if _has_delivery_activity(sales_order):
-			return
-
 		if doc.per_delivered and doc.per_delivered > 0:
 			values["per_delivered"] = 0
 
 		if doc.status == "Completed":
 			values["status"] = "To Deliver and Bill"
 
-	if values:
-		_set_existing_fields("Sales Order", sales_order, values, update_modified=False)
+		# Only look for submitted Delivery Notes when we would actually reopen the order.
+		if values and _has_delivery_activity(sales_order):
+			return {}
+
+	return values
 
 
 def _is_fulfilled(order: dict[str, Any]) -> bool:
@@ -271,12 +612,9 @@ def _is_cash_on_delivery(gateways: list[str], order: dict[str, Any]) -> bool:
 	return False
 
 
-def _apply_customer_metadata(customer: ShopifyCustomer, shopify_customer: dict[str, Any], order: dict[str, Any]) -> None:
-	try:
-		customer_doc = customer.get_customer_doc()
-	except frappe.DoesNotExistError:
-		return
-
+def _customer_metadata_updates(
+	customer_doc, shopify_customer: dict[str, Any], order: dict[str, Any]
+) -> dict[str, Any]:
 	updates: dict[str, Any] = {}
 	first_name = (shopify_customer.get("first_name") or "").strip()
 	last_name = (shopify_customer.get("last_name") or "").strip()
@@ -291,24 +629,19 @@ def _apply_customer_metadata(customer: ShopifyCustomer, shopify_customer: dict[s
 	if email and customer_doc.meta.has_field("email_id") and customer_doc.email_id != email:
 		updates["email_id"] = email
 
-	if updates:
-		customer_doc.update(updates)
-		customer_doc.flags.ignore_mandatory = True
-		customer_doc.save(ignore_permissions=True)
+	return updates
 
 
-def _set_existing_fields(doctype: str, name: str, values: dict[str, Any], update_modified: bool = False) -> None:
+def _set_existing_fields(
+	doctype: str, name: str, values: dict[str, Any], update_modified: bool = False
+) -> None:
 	"""Set only those fields that exist on the DocType **and** as DB columns."""
 
 	if not values:
 		return
 
-	meta = frappe.get_meta(doctype)
-	valid_values = {
-		field: val
-		for field, val in values.items()
-		if meta.has_field(field) and frappe.db.has_column(doctype, field)
-	}
+	columns = get_writable_columns(doctype)
+	valid_values = {field: val for field, val in values.items() if field in columns}
 
 	if not valid_values:
 		return
@@ -316,33 +649,66 @@ def _set_existing_fields(doctype: str, name: str, values: dict[str, Any], update
 	frappe.db.set_value(doctype, name, valid_values, update_modified=update_modified)
 
 
-def _refresh_address_docs(customer: ShopifyCustomer, shopify_customer: dict[str, Any], order: dict[str, Any]) -> None:
+def _refresh_address_docs(customer_doc, shopify_customer: dict[str, Any], order: dict[str, Any]) -> None:
 	mapping = {
 		"Shipping": shopify_customer.get("shipping_address") or order.get("shipping_address"),
 		"Billing": shopify_customer.get("billing_address") or order.get("billing_address"),
 	}
+	address_names = _get_customer_address_names(customer_doc.name)
 
 	for address_type, address_data in mapping.items():
-		if not isinstance(address_data, dict):
+		if not isinstance(address_data, dict) or not address_names.get(address_type):
 			continue
 
-		address_doc = customer.get_customer_address_doc(address_type)
-		if not address_doc:
-			continue
+		address_doc = frappe.get_doc("Address", address_names[address_type])
 
 		update_dict = _sanitize_address_fields(address_data)
-		update_dict["email_id"] = address_data.get("email") or shopify_customer.get("email") or order.get("email")
+		update_dict["email_id"] = (
+			address_data.get("email") or shopify_customer.get("email") or order.get("email")
+		)
 		update_dict["phone"] = address_data.get("phone")
 		update_dict["address_title"] = (
-			address_data.get("name") or customer.get_customer_doc().customer_name or address_doc.address_title
+			address_data.get("name") or customer_doc.customer_name or address_doc.address_title
 		)
 
-		address_doc.update({k: v for k, v in update_dict.items() if v not in (None, "")})
+		values = {k: v for k, v in update_dict.items() if v not in (None, "")}
+		if not any(cstr(address_doc.get(field)) != cstr(value) for field, value in values.items()):
+			# Usually already written by ShopifyCustomer.update_existing_addresses moments ago.
+			frappe.cache.incrby(frappe.cache.make_key(SKIPPED_ADDRESS_SAVES_KEY), 1)
+			continue
+
+		address_doc.update(values)
 		address_doc.flags.ignore_version = True
 		address_doc.flags.ignore_mandatory = True
 		address_doc.save(ignore_permissions=True)
 
 
+def get_skipped_address_saves() -> int:
+	"""Number of Address saves skipped because the Shopify address matched the stored one."""
+
+	return cint(frappe.cache.get(frappe.cache.make_key(SKIPPED_ADDRESS_SAVES_KEY)))
+
+
+def _get_customer_address_names(customer: str) -> dict[str, str]:
+	"""Latest Shipping/Billing Address per type linked to ``customer``, like ``get_customer_address_doc``."""
+
+	rows = frappe.get_all(
+		"Address",
+		filters=[
+			["Dynamic Link", "link_doctype", "=", "Customer"],
+			["Dynamic Link", "link_name", "=", customer],
+			["address_type", "in", ["Shipping", "Billing"]],
+		],
+		fields=["name", "address_type"],
+		order_by="modified desc",
+	)
+
+	names: dict[str, str] = {}
+	for row in rows:
+		names.setdefault(row.address_type, row.name)
+	return names
+
+
 def _sanitize_address_fields(address: dict[str, Any]) -> dict[str, Any]:
 	def clean(value: str | None) -> str | None:
 		if not value:
@@ -360,30 +726,79 @@ def _sanitize_address_fields(address: dict[str, Any]) -> dict[str, Any]:
 	}
 
 
-def _update_customer_territory(customer: ShopifyCustomer, order: dict[str, Any]) -> None:
-	try:
-		customer_doc = customer.get_customer_doc()
-	except frappe.DoesNotExistError:
-		return
-
+def _customer_territory_updates(customer_doc, order: dict[str, Any]) -> dict[str, Any]:
 	shipping_address = order.get("shipping_address") or {}
 	territory_name = shipping_address.get("country")
 	if not territory_name:
-		return
+		return {}
 
-	territory = _ensure_territory_exists(territory_name)
+	territory = _ensure_territory_exists(territory_name, shipping_address.get("country_code"))
 	if territory and customer_doc.territory != territory:
-		customer_doc.territory = territory
-		customer_doc.flags.ignore_mandatory = True
-		customer_doc.save(ignore_permissions=True)
+		return {"territory": territory}
+	return {}
+
+
+def _ensure_territory_exists(name: str | None, country_code: str | None = None) -> str | None:
+	"""Resolve (creating if needed) the Territory for a country, normally without touching the DB.
 
+	Territory names and country-code aliases are shared by all workers through one Redis hash,
+	loaded with every Territory by the first lookup that finds it missing and dropped by
+	:func:`clear_territory_cache` on Territory rename/trash; failed creations are remembered for
+	``TERRITORY_FAILURE_TTL``.
+	"""
 
-def _ensure_territory_exists(name: str | None) -> str | None:
 	if not name:
 		return None
 
-	if frappe.db.exists("Territory", name):
-		return name
+	code_key = f"code:{country_code.upper()}" if country_code else None
+	for key in (name, code_key):
+		territory = frappe.cache.hget(TERRITORY_CACHE_KEY, key) if key else None
+		if territory:
+			return territory
+
+	if _warm_territory_cache():
+		territory = frappe.cache.hget(TERRITORY_CACHE_KEY, name)
+	else:
+		territory = name if frappe.db.exists("Territory", name) else None
+
+	if territory:
+		_remember_territory(territory, name, code_key)
+		return territory
+
+	territory = _create_territory(name)
+	if territory:
+		# A freshly inserted Territory only becomes cacheable once the transaction commits. A
+		# rollback to a savepoint keeps this callback queued, so re-check that the row survived.
+		frappe.db.after_commit.add(lambda: _remember_created_territory(territory, name, code_key))
+	return territory
+
+
+def _warm_territory_cache() -> bool:
+	"""Load every Territory into the shared hash if it is missing; return whether it was loaded."""
+
+	if frappe.cache.exists(TERRITORY_CACHE_KEY):
+		return False
+
+	for territory in frappe.get_all("Territory", pluck="name"):
+		frappe.cache.hset(TERRITORY_CACHE_KEY, territory, territory)
+	return True
+
+
+def _remember_created_territory(territory: str, *keys: str | None) -> None:
+	if frappe.db.exists("Territory", territory):
+		_remember_territory(territory, *keys)
+
+
+def _remember_territory(territory: str, *keys: str | None) -> None:
+	for key in keys:
+		if key:
+			frappe.cache.hset(TERRITORY_CACHE_KEY, key, territory)
+
+
+def _create_territory(name: str) -> str | None:
+	failure_key = f"{TERRITORY_CACHE_KEY}:failed:{name}"
+	if frappe.cache.get_value(failure_key):
+		return None
 
 	root = get_root_of("Territory")
 	try:
@@ -396,6 +811,13 @@ def _ensure_territory_exists(name: str | None) -> str | None:
 		).insert(ignore_permissions=True)
 	except Exception:  # pragma: no cover
 		frappe.log_error(message=frappe.get_traceback(), title=f"Unable to create Territory {name}")
+		frappe.cache.set_value(failure_key, 1, expires_in_sec=TERRITORY_FAILURE_TTL)
 		return None
 
 	return name
+
+
+def clear_territory_cache(*args, **kwargs) -> None:
+	"""Drop cached territory lookups (hooked to Territory rename/trash)."""
+
+	frappe.cache.delete_value(TERRITORY_CACHE_KEY)
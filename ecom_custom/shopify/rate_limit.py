@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import functools
+import time
+from typing import Any
+
+import frappe
+from frappe.utils import cint, flt
+
+CALL_LIMIT_HEADER = "X-Shopify-Shop-Api-Call-Limit"
+RETRY_AFTER_HEADER = "Retry-After"
+
+# Shopify's REST bucket refills at 1/20th of its size per second (40 -> 2/s, 400 on Plus -> 20/s).
+DEFAULT_BUCKET_SIZE = 40
+LEAK_DIVISOR = 20
+DEFAULT_HEADROOM = 2
+MAX_RETRIES = 5
+MAX_WAIT_SECONDS = 10.0
+
+_BUCKET_KEY = "ecom_custom:shopify:rest_call_bucket"
+
+# Atomically take one call from the shared bucket. Returns "0" when the caller may proceed,
+# otherwise the number of seconds to wait before trying again.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local capacity = tonumber(redis.call('HGET', KEYS[1], 'capacity') or ARGV[2])
+local used = tonumber(redis.call('HGET', KEYS[1], 'used') or '0')
+local ts = tonumber(redis.call('HGET', KEYS[1], 'ts') or ARGV[1])
+local paused_until = tonumber(redis.call('HGET', KEYS[1], 'paused_until') or '0')
+local leak = capacity / tonumber(ARGV[3])
+local limit = capacity - tonumber(ARGV[4])
+
+if now < paused_until then
+	return tostring(paused_until - now)
+end
+
+used = math.max(0, used - (now - ts) * leak)
+if used + 1 > limit then
+	return tostring((used + 1 - limit) / leak)
+end
+
+redis.call('HSET', KEYS[1], 'used', tostring(used + 1), 'capacity', tostring(capacity), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 300)
+return '0'
+"""
+
+# Plain HSET/EXPIRE through Lua: frappe's RedisWrapper pickles values written via ``hset``.
+_UPDATE_SCRIPT = """
+for i = 1, #ARGV, 2 do
+	redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], 300)
+return 1
+"""
+
+
+class RateLimiter:
+	"""Redis-backed token bucket shared by every worker talking to the Shopify REST API.
+
+	The bucket is estimated locally between calls and re-synchronised from the
+	``X-Shopify-Shop-Api-Call-Limit`` header after each response. A 429 pauses all workers for
+	the ``Retry-After`` interval.
+
+	The Redis key is resolved on construction, so an instance can be handed to helper threads
+	that have no Frappe site context of their own.
+	"""
+
+	def __init__(self) -> None:
+		self.cache = frappe.cache
+		self.key = frappe.cache.make_key(_BUCKET_KEY)
+		self.headroom = cint(frappe.conf.get("shopify_api_headroom") or DEFAULT_HEADROOM)
+		self.default_capacity = cint(frappe.conf.get("shopify_api_bucket_size") or DEFAULT_BUCKET_SIZE)
+
+	def call(self, func, *args, **kwargs) -> Any:
+		for attempt in range(MAX_RETRIES + 1):
+			self.acquire()
+			try:
+				result = func(*args, **kwargs)
+			except Exception as exc:
+				response = getattr(exc, "response", None)
+				if getattr(response, "code", None) != 429 or attempt == MAX_RETRIES:
+					raise
+				self.pause(flt(_get_header(response, RETRY_AFTER_HEADER)) or 2.0)
+				continue
+
+			self.record(_last_response())
+			return result
+
+	def acquire(self) -> None:
+		while True:
+			wait = flt(
+				self.cache.eval(
+					_ACQUIRE_SCRIPT,
+					1,
+					self.key,
+					time.time(),
+					self.default_capacity,
+					LEAK_DIVISOR,
+					self.headroom,
+				)
+			)
+			if wait <= 0:
+				return
+			time.sleep(min(wait, MAX_WAIT_SECONDS))
+
+	def record(self, response: Any) -> None:
+		used, capacity = _parse_call_limit(_get_header(response, CALL_LIMIT_HEADER))
+		if not capacity:
+			return
+
+		self.cache.eval(_UPDATE_SCRIPT, 1, self.key, "used", used, "capacity", capacity, "ts", time.time())
+
+	def pause(self, seconds: float) -> None:
+		self.cache.eval(_UPDATE_SCRIPT, 1, self.key, "paused_until", time.time() + seconds)
+
+
+def throttled(func):
+	"""Run a Shopify REST call through the shared rate limiter, retrying on 429.
+
+	Apply inside ``temp_shopify_session`` so the connection used for the call is active.
+	"""
+
+	@functools.wraps(func)
+	def wrapper(*args, **kwargs):
+		return RateLimiter().call(func, *args, **kwargs)
+
+	return wrapper
+
+
+def _last_response() -> Any:
+	from shopify.base import ShopifyResource
+
+	try:
+		return ShopifyResource.connection.response
+	except Exception:
+		return None
+
+
+def _get_header(response: Any, header: str) -> str | None:
+	headers = getattr(response, "headers", None) or {}
+	for key, value in headers.items():
+		if key.lower() == header.lower():
+			return value
+	return None
+
+
+def _parse_call_limit(value: str | None) -> tuple[int, int]:
+	if not value or "/" not in value:
+		return 0, 0
+	used, _, capacity = value.partition("/")
+	return cint(used), cint(capacity)
@@ -1,84 +1,432 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
-from datetime import timedelta
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Any
 
 import frappe
-from frappe.utils import get_datetime
+from frappe.utils import add_days, cint, get_datetime, getdate, now_datetime
 from shopify.resources import Order
 
 from ecommerce_integrations.shopify.connection import temp_shopify_session
-from ecommerce_integrations.shopify.constants import ORDER_ID_FIELD
+from ecommerce_integrations.shopify.constants import ORDER_ID_FIELD, SETTING_DOCTYPE
 from ecom_custom.shopify import order_overrides
+from ecom_custom.shopify.rate_limit import RateLimiter
 
 
-def reconcile_sales_orders(order_names: Sequence[str] | None = None, limit: int | None = None) -> dict[str, Any]:
-	"""Re-fetch Shopify payloads for existing Sales Orders and update their metadata."""
+RECONCILE_BATCH_SIZE = 500
+RECONCILE_WINDOW_DAYS = 7
+ORDERS_PER_ID_REQUEST = 250
+ID_FETCH_CONCURRENCY = 4
+WATERMARK_KEY = "ecom_custom_shopify_reconcile_watermark"
+INITIAL_LOOKBACK_HOURS = 24
+# Orders committed on Shopify's side with an ``updated_at`` shortly before a run started can
+# become visible only after the run's query; the next run re-reads this overlap.
+WATERMARK_MARGIN_MINUTES = 5
+RECONCILE_SAVEPOINT = "shopify_reconcile_order"
+RECONCILE_RUN_KEY = "ecom_custom:shopify:reconcile_run"
+RECONCILE_RUN_TTL = 7 * 24 * 3600
+
+
+def reconcile_sales_orders(
+	order_names: Sequence[str] | None = None, limit: int | None = None, force: bool = True
+) -> dict[str, Any]:
+	"""Re-fetch Shopify payloads for existing Sales Orders and update their metadata.
+
+	Without ``order_names`` every Shopify Sales Order is walked in ``transaction_date`` order, in
+	windows spanning at most ``RECONCILE_WINDOW_DAYS``. Windows cover non-overlapping date ranges
+	and each range is streamed from Shopify once, so memory stays bounded by the window regardless
+	of the overall date spread.
+
+	By default every order is re-applied, so ERP-side drift (manual edits, documents submitted
+	after their last sync) is repaired; with ``force=False`` orders whose payload fingerprint
+	has not changed since the last sync are skipped.
+	"""
+
+	stats = _empty_stats()
 
 	if order_names:
-		targets = [
-			{"name": name, ORDER_ID_FIELD: frappe.db.get_value("Sales Order", name, ORDER_ID_FIELD)}
-			for name in order_names
-		]
+		stats["total"] = len(order_names)
+		_reconcile_named_orders(list(order_names), stats, force)
+		return stats
+
+	carried: dict[str, dict[str, Any]] = {}
+	for start, end, window in _iter_target_windows(limit):
+		stats["total"] += len(window)
+		carried = _reconcile_window(start, end, window, carried, stats, force)
+		frappe.db.commit()
+
+	for row in carried.values():
+		_reconcile_row(row, None, stats, force)
+	frappe.db.commit()
+
+	return stats
+
+
+def enqueue_reconcile_sales_orders(
+	order_names: Sequence[str] | None = None,
+	chunk_size: int = RECONCILE_BATCH_SIZE,
+	force: bool = True,
+	limit: int | None = None,
+) -> str:
+	"""Split a reconcile into chunks of ``chunk_size`` Sales Orders and run them as parallel jobs.
+
+	Each chunk commits on its own and every order runs inside a savepoint, so a failing order
+	only loses its own changes. Returns a run id for :func:`get_reconcile_status`.
+	"""
+
+	names = list(order_names) if order_names else [row.name for row in _iter_targets(limit)]
+	chunk_size = max(cint(chunk_size), 1)
+	chunks = [names[start : start + chunk_size] for start in range(0, len(names), chunk_size)]
+
+	run_id = frappe.generate_hash(length=10)
+	key = _run_key(run_id)
+	frappe.cache.hset(
+		key, "meta", {"chunks": len(chunks), "total": len(names), "started_at": str(now_datetime())}
+	)
+	frappe.cache.expire(frappe.cache.make_key(key), RECONCILE_RUN_TTL)
+
+	for index, chunk in enumerate(chunks):
+		frappe.enqueue(
+			"ecom_custom.shopify.reconcile.reconcile_sales_orders_chunk",
+			queue="long",
+			job_id=f"shopify_reconcile::{run_id}::{index}",
+			deduplicate=True,
+			run_id=run_id,
+			index=index,
+			order_names=chunk,
+			force=force,
+		)
+
+	return run_id
+
+
+def reconcile_sales_orders_chunk(run_id: str, index: int, order_names: list[str], force: bool = True) -> None:
+	try:
+		stats = reconcile_sales_orders(order_names=order_names, force=force)
+	except Exception as exc:
+		frappe.db.rollback()
+		frappe.log_error(
+			message=frappe.get_traceback(), title=f"Shopify reconcile chunk {run_id}/{index} failed"
+		)
+		stats = _empty_stats()
+		stats.update(total=len(order_names), failed=str(exc))
 	else:
-		targets = frappe.get_all(
-			"Sales Order",
-			filters={ORDER_ID_FIELD: ["is", "set"]},
-			fields=["name", ORDER_ID_FIELD, "transaction_date"],
-			limit=limit or 0,
+		frappe.db.commit()
+
+	frappe.cache.hset(_run_key(run_id), f"chunk:{index}", stats)
+
+
+def get_reconcile_status(run_id: str) -> dict[str, Any]:
+	"""Aggregate the per-chunk stats of a parallel reconcile run."""
+
+	raw = frappe.cache.hgetall(_run_key(run_id)) or {}
+	entries = {frappe.safe_decode(field): value for field, value in raw.items()}
+	meta = entries.pop("meta", None)
+	if not meta:
+		return {}
+
+	status = {
+		"run_id": run_id,
+		"total": meta["total"],
+		"chunks": meta["chunks"],
+		"chunks_completed": len(entries),
+		"failed_chunks": [],
+		"updated": 0,
+		"unchanged": 0,
+		"missing": [],
+		"errors": {},
+		"started_at": meta["started_at"],
+	}
+	for field, stats in sorted(entries.items()):
+		status["updated"] += stats.get("updated", 0)
+		status["unchanged"] += stats.get("unchanged", 0)
+		status["missing"].extend(stats.get("missing") or [])
+		status["errors"].update(stats.get("errors") or {})
+		if stats.get("failed"):
+			status["failed_chunks"].append(field.partition(":")[2])
+
+	processed = status["updated"] + status["unchanged"] + len(status["missing"]) + len(status["errors"])
+	status["progress"] = processed / status["total"] if status["total"] else 1.0
+	status["done"] = status["chunks_completed"] >= status["chunks"]
+	return status
+
+
+def _empty_stats() -> dict[str, Any]:
+	return {"total": 0, "updated": 0, "unchanged": 0, "missing": [], "errors": {}}
+
+
+def _run_key(run_id: str) -> str:
+	return f"{RECONCILE_RUN_KEY}:{run_id}"
+
+
+def reconcile_updated_orders(force: bool = False) -> dict[str, Any]:
+	"""Reconcile only the orders Shopify reports as updated since the last incremental run.
+
+	The high-water mark is stored as a global default. Each run fetches ``updated_at`` between
+	the mark and the run's start time, updates the matching existing Sales Orders (orders not yet
+	in ERPNext are left to the webhook/import flow) and, once every page has been committed,
+	advances the mark to the run's start, less ``WATERMARK_MARGIN_MINUTES``, in a commit of its
+	own. A run interrupted before then leaves the mark untouched, so the next run repeats the
+	interval; orders re-read because of the margin or a repeat are skipped by their unchanged
+	payload fingerprint.
+	"""
+
+	run_started = now_datetime()
+	watermark = frappe.db.get_global(WATERMARK_KEY)
+	since = get_datetime(watermark) if watermark else run_started - timedelta(hours=INITIAL_LOOKBACK_HOURS)
+
+	stats = _empty_stats()
+	stats["since"] = str(since)
+
+	_reconcile_pages(order_overrides.iter_updated_order_pages(since, run_started), stats, force)
+
+	frappe.db.set_global(WATERMARK_KEY, str(run_started - timedelta(minutes=WATERMARK_MARGIN_MINUTES)))
+	frappe.db.commit()
+	return stats
+
+
+def reconcile_from_bulk_operation(
+	from_time, to_time, date_field: str = "updated_at", force: bool = False
+) -> dict[str, Any]:
+	"""Reconcile existing Sales Orders from a Shopify GraphQL bulk export of the given range.
+
+	Meant for large historical ranges, where one bulk operation is far cheaper than walking the
+	REST pages; see :mod:`ecom_custom.shopify.bulk_operations`.
+	"""
+
+	from ecom_custom.shopify.bulk_operations import iter_bulk_order_pages
+
+	stats = _empty_stats()
+	_reconcile_pages(iter_bulk_order_pages(from_time, to_time, date_field=date_field), stats, force)
+	return stats
+
+
+def enqueue_incremental_reconcile() -> None:
+	"""Scheduler entry point: run :func:`reconcile_updated_orders` unless a run is still queued or active."""
+
+	if not frappe.db.get_single_value(SETTING_DOCTYPE, "enable_shopify"):
+		return
+
+	frappe.enqueue(
+		"ecom_custom.shopify.reconcile.reconcile_updated_orders",
+		queue="long",
+		job_id="ecom_custom::shopify_incremental_reconcile",
+		deduplicate=True,
+	)
+
+
+def _reconcile_pages(pages: Iterator[list[dict[str, Any]]], stats: dict[str, Any], force: bool) -> None:
+	# Only orders that already have a Sales Order are reconciled; one commit per page.
+	for orders in pages:
+		order_overrides.prime_sales_order_names([order.get("id") for order in orders])
+		for order in orders:
+			name = order_overrides._get_sales_order_name(str(order.get("id")))  # type: ignore[attr-defined]
+			if not name:
+				continue
+			stats["total"] += 1
+			_reconcile_row({"name": name, ORDER_ID_FIELD: order.get("id")}, order, stats, force)
+		frappe.db.commit()
+
+
+def _reconcile_named_orders(order_names: list[str], stats: dict[str, Any], force: bool) -> None:
+	"""Resolve names with one query and fetch their payloads with concurrent ``ids=`` requests."""
+
+	rows = frappe.get_all(
+		"Sales Order",
+		filters={"name": ["in", order_names]},
+		fields=["name", ORDER_ID_FIELD],
+		limit=0,
+	)
+	by_name = {row.name: row for row in rows}
+	stats["missing"].extend(name for name in order_names if name not in by_name)
+
+	targets = [by_name[name] for name in order_names if name in by_name]
+	group_size = ORDERS_PER_ID_REQUEST * ID_FETCH_CONCURRENCY
+	for start in range(0, len(targets), group_size):
+		group = targets[start : start + group_size]
+		payloads = (
+			_fetch_payloads_by_id([row[ORDER_ID_FIELD] for row in group if row.get(ORDER_ID_FIELD)]) or {}
 		)
+		for row in group:
+			_reconcile_row(row, payloads.get(str(row.get(ORDER_ID_FIELD))), stats, force)
 
-	stats = {"total": len(targets), "updated": 0, "missing": [], "errors": {}}
-	payload_cache = _bulk_fetch_payloads(targets) if not order_names else {}
 
-	for row in targets:
-		order_id = row.get(ORDER_ID_FIELD)
-		if not order_id:
+def _reconcile_window(
+	start: datetime,
+	end: datetime,
+	window: list[dict[str, Any]],
+	carried: dict[str, dict[str, Any]],
+	stats: dict[str, Any],
+	force: bool,
+) -> dict[str, dict[str, Any]]:
+	"""Match the window's rows, plus those ``carried`` over from the previous window, against the
+	orders Shopify reports for ``start``..``end``; return the window's rows left unmatched.
+	"""
+
+	pending: dict[str, dict[str, Any]] = {}
+	for row in window:
+		if row.get(ORDER_ID_FIELD):
+			pending[str(row[ORDER_ID_FIELD])] = row
+		else:
 			stats["missing"].append(row["name"])
-			continue
 
-		payload = payload_cache.get(str(order_id))
-		if not payload:
-			payload = _fetch_order_payload(order_id)
+	targets = {**carried, **pending}
+	if targets:
+		for order in order_overrides.fetch_old_orders_any(start, end):
+			row = targets.pop(str(order.get("id")), None)
+			if row:
+				_reconcile_row(row, order, stats, force)
+			if not targets:
+				break
 
-		if not payload:
-			stats["missing"].append(row["name"])
-			continue
+	# Carried rows were missed by two consecutive ranges (e.g. edited transaction dates); they are
+	# fetched one by one, the window's own misses get another chance in the next range.
+	for order_id, row in carried.items():
+		if targets.pop(order_id, None):
+			_reconcile_row(row, None, stats, force)
 
-		try:
-			order_overrides._post_process_sales_order(payload, row["name"])  # type: ignore[attr-defined]
-		except Exception as exc:  # pragma: no cover - defensive safeguard
-			stats["errors"][row["name"]] = str(exc)
-			continue
+	return targets
 
-		stats["updated"] += 1
 
-	return stats
+def _reconcile_row(
+	row: dict[str, Any], payload: dict[str, Any] | None, stats: dict[str, Any], force: bool
+) -> None:
+	order_id = row.get(ORDER_ID_FIELD)
+	if not order_id:
+		stats["missing"].append(row["name"])
+		return
 
+	if not payload:
+		payload = _fetch_order_payload(order_id)
 
-def _bulk_fetch_payloads(targets: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
-	if not targets:
-		return {}
+	if not payload:
+		stats["missing"].append(row["name"])
+		return
 
-	dates = [row.get("transaction_date") for row in targets if row.get("transaction_date")]
-	if not dates:
-		return {}
+	frappe.db.savepoint(RECONCILE_SAVEPOINT)
+	try:
+		updated = order_overrides._post_process_sales_order(payload, row["name"], force=force)  # type: ignore[attr-defined]
+	except Exception as exc:  # pragma: no cover - defensive safeguard
+		frappe.db.rollback(save_point=RECONCILE_SAVEPOINT)
+		stats["errors"][row["name"]] = str(exc)
+		return
+
+	stats["updated" if updated else "unchanged"] += 1
+
+
+def _iter_target_windows(
+	limit: int | None = None,
+) -> Iterator[tuple[datetime, datetime, list[dict[str, Any]]]]:
+	"""Yield ``(start, end, rows)`` for Shopify Sales Orders sorted by date.
+
+	Windows hold whole days, span at most RECONCILE_WINDOW_DAYS and are closed once they reach
+	RECONCILE_BATCH_SIZE rows. Their ranges never overlap: each runs from its first day until the
+	next window's first day, but at most one day past its own last day, since Shopify's
+	``created_at`` can fall on the next day in the server's timezone.
+	"""
+
+	window: list[dict[str, Any]] = []
+	for row in _iter_targets(limit):
+		if window and getdate(row.transaction_date) != getdate(window[-1].transaction_date):
+			span = getdate(row.transaction_date) - getdate(window[0].transaction_date)
+			if span >= timedelta(days=RECONCILE_WINDOW_DAYS) or len(window) >= RECONCILE_BATCH_SIZE:
+				yield (*_window_range(window, row.transaction_date), window)
+				window = []
+		window.append(row)
+
+	if window:
+		yield (*_window_range(window, None), window)
+
+
+def _window_range(window: list[dict[str, Any]], next_date) -> tuple[datetime, datetime]:
+	start = get_datetime(getdate(window[0].transaction_date))
+	end = get_datetime(add_days(getdate(window[-1].transaction_date), 1))
+	if next_date:
+		end = min(end, get_datetime(getdate(next_date)))
+	# ``created_at_max`` is inclusive.
+	return start, end - timedelta(seconds=1)
+
+
+def _iter_targets(limit: int | None = None) -> Iterator[dict[str, Any]]:
+	# Keyset pagination on (transaction_date, name) keeps each query cheap and the result set small.
+	last_date, last_name = "0001-01-01", ""
+	remaining = cint(limit) or None
+
+	while True:
+		page_size = min(RECONCILE_BATCH_SIZE, remaining) if remaining else RECONCILE_BATCH_SIZE
+		rows = frappe.db.sql(
+			f"""
+			select name, `{ORDER_ID_FIELD}`, transaction_date
+			from `tabSales Order`
+			where coalesce(`{ORDER_ID_FIELD}`, '') != ''
+				and (transaction_date > %(date)s or (transaction_date = %(date)s and name > %(name)s))
+			order by transaction_date, name
+			limit %(page_size)s
+			""",
+			{"date": last_date, "name": last_name, "page_size": page_size},
+			as_dict=True,
+		)
+		yield from rows
+
+		if remaining:
+			remaining -= len(rows)
+		if len(rows) < page_size or remaining == 0:
+			return
+		last_date, last_name = rows[-1].transaction_date, rows[-1].name
+
+
+@temp_shopify_session
+def _fetch_payloads_by_id(order_ids: list[str | int]) -> dict[str, dict[str, Any]]:
+	"""Fetch orders by id, ``ORDERS_PER_ID_REQUEST`` per call, ``ID_FETCH_CONCURRENCY`` calls at a time.
+
+	Helper threads only perform HTTP and share the rate limiter created here. ShopifyResource
+	keeps the site and access token per thread, so each helper activates the caller's session
+	and site.
+	"""
+
+	import shopify
+
+	site = shopify.ShopifyResource.get_site()
+	session = shopify.Session(
+		shopify.ShopifyResource.url,
+		shopify.ShopifyResource.get_version(),
+		shopify.ShopifyResource.get_headers().get("X-Shopify-Access-Token"),
+	)
+	limiter = RateLimiter()
+	batches = [
+		[str(order_id) for order_id in order_ids[start : start + ORDERS_PER_ID_REQUEST]]
+		for start in range(0, len(order_ids), ORDERS_PER_ID_REQUEST)
+	]
 
-	start = get_datetime(min(dates)) - timedelta(days=1)
-	end = get_datetime(max(dates)) + timedelta(days=1)
+	def fetch(batch: list[str]) -> list[dict[str, Any]]:
+		shopify.ShopifyResource.activate_session(session)
+		# The active site can differ from the one derived from the shop URL (e.g. a local stand-in).
+		shopify.ShopifyResource.site = site
+		orders = limiter.call(Order.find, ids=",".join(batch), status="any", limit=ORDERS_PER_ID_REQUEST)
+		return [order.to_dict() for order in orders]
 
-	cache: dict[str, dict[str, Any]] = {}
-	for order in order_overrides.fetch_old_orders_any(start, end):
-		cache[str(order.get("id"))] = order
+	payloads: dict[str, dict[str, Any]] = {}
+	with ThreadPoolExecutor(max_workers=ID_FETCH_CONCURRENCY) as executor:
+		futures = [executor.submit(fetch, batch) for batch in batches]
+		for future in futures:
+			try:
+				orders = future.result()
+			except Exception:
+				# Orders of a failed batch are retried one by one by the caller.
+				frappe.log_error(message=frappe.get_traceback(), title="Shopify reconcile batch fetch failed")
+				continue
+			for order in orders:
+				payloads[str(order.get("id"))] = order
 
-	return cache
+	return payloads
 
 
 @temp_shopify_session
 def _fetch_order_payload(order_id: str | int) -> dict[str, Any] | None:
 	try:
-		order = Order.find(order_id)
+		order = RateLimiter().call(Order.find, order_id)
 	except Exception:
 		return None
 
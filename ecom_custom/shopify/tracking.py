@@ -1,42 +1,298 @@
 from __future__ import annotations
 
+import functools
 import json
-import frappe
-from frappe.utils import now_datetime
-from shopify.resources import Fulfillment
+import time
 
+import frappe
 from ecommerce_integrations.shopify.connection import temp_shopify_session
 from ecommerce_integrations.shopify.constants import FULLFILLMENT_ID_FIELD
+from ecommerce_integrations.shopify.utils import create_shopify_log
+from frappe.utils import add_days, cint, flt, now_datetime, nowdate
+from shopify.resources import Fulfillment
+
+from ecom_custom.shopify.columns import get_writable_columns
+from ecom_custom.shopify.rate_limit import RateLimiter
+
+TRACKING_CACHE_KEY = "ecom_custom:shopify:tracking_payload"
+DEFAULT_TRACKING_CACHE_TTL = 10 * 60
+DEFAULT_TRACKING_LOOKBACK_DAYS = 30
+TRACKING_FIELDS = ("tracking_no", "transporter_name", "shopify_tracking_urls")
+FULFILLMENT_WEBHOOK_EVENTS = ("fulfillments/create", "fulfillments/update")
 
+TRACKING_ENTRY_DOCTYPE = "Shopify Tracking Entry"
+TRACKING_ENTRY_UPSERT_FIELDS = (
+	"modified",
+	"modified_by",
+	"tracking_numbers",
+	"tracking_urls",
+	"tracking_company",
+	"synced_on",
+)
 
-def populate_delivery_note_tracking(doc, method=None):  # noqa: ANN001
-	"""Hook for Delivery Note events to fetch Shopify tracking numbers."""
+# ``nodes`` accepts at most 250 ids per request.
+GRAPHQL_BATCH_SIZE = 250
+GRAPHQL_MAX_RETRIES = 5
+FULFILLMENT_TRACKING_QUERY = """
+query FulfillmentTracking($ids: [ID!]!) {
+	nodes(ids: $ids) {
+		... on Fulfillment {
+			legacyResourceId
+			trackingInfo {
+				company
+				number
+				url
+			}
+		}
+	}
+}
+"""
+
+
+def populate_delivery_note_tracking(doc, method=None):
+	"""Hook for Delivery Note events: queue a background fetch of Shopify tracking numbers.
+
+	The Shopify call runs after the save commits, so saving a note never waits on the API. The
+	job is deduplicated per fulfillment, so ``before_save`` + ``on_submit`` fetch only once.
+	"""
 
 	fulfillment_id = doc.get(FULLFILLMENT_ID_FIELD)
 	if not fulfillment_id:
 		return
 
-	tracking_payload = _get_tracking_payload(fulfillment_id)
-	if not tracking_payload:
+	queued = frappe.flags.shopify_tracking_queued
+	if queued is None:
+		queued = frappe.flags.shopify_tracking_queued = set()
+	if fulfillment_id in queued:
 		return
+	queued.add(fulfillment_id)
 
-	_tracking_numbers = tracking_payload.get("tracking_numbers") or []
-	if _tracking_numbers:
-		doc.tracking_no = ", ".join(_tracking_numbers)
+	frappe.enqueue(
+		"ecom_custom.shopify.tracking.update_delivery_note_tracking",
+		queue="short",
+		job_id=f"shopify_tracking::{fulfillment_id}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		delivery_note=doc.name,
+	)
 
-	if tracking_payload.get("tracking_company"):
-		doc.transporter_name = tracking_payload.get("tracking_company")
 
-	if tracking_payload.get("tracking_urls"):
-		doc.shopify_tracking_urls = "\n".join(tracking_payload["tracking_urls"])
+def update_delivery_note_tracking(delivery_note: str) -> None:
+	"""Fetch the Shopify fulfillment of a Delivery Note and write its tracking details."""
+
+	if not frappe.db.exists("Delivery Note", delivery_note):
+		return
+
+	doc = frappe.get_doc("Delivery Note", delivery_note)
+	fulfillment_id = doc.get(FULLFILLMENT_ID_FIELD)
+	if not fulfillment_id:
+		return
+
+	tracking_payload = get_tracking_payload(fulfillment_id)
+	if not tracking_payload:
+		return
+
+	values = _changed_tracking_values(doc, tracking_payload)
+	if values:
+		# Direct write: the note may be submitted and must not re-trigger its save hooks.
+		frappe.db.set_value("Delivery Note", delivery_note, values, update_modified=False)
 
 	_store_tracking_snapshot(doc, tracking_payload)
 
 
+def refresh_stale_tracking(lookback_days: int | None = None) -> dict[str, int]:
+	"""Bulk-refresh tracking for Delivery Notes linked to Shopify fulfillments.
+
+	Targets notes without a ``tracking_no`` plus every note posted within ``lookback_days``
+	(carriers often change while a shipment is recent). Fulfillments are fetched with batched
+	GraphQL ``nodes`` queries and written back with ``bulk_update``.
+	"""
+
+	lookback_days = cint(
+		lookback_days or frappe.conf.get("shopify_tracking_lookback_days") or DEFAULT_TRACKING_LOOKBACK_DAYS
+	)
+	columns = get_writable_columns("Delivery Note")
+	fields = ["name", FULLFILLMENT_ID_FIELD, *(field for field in TRACKING_FIELDS if field in columns)]
+
+	notes = frappe.get_all(
+		"Delivery Note",
+		filters=[[FULLFILLMENT_ID_FIELD, "is", "set"], ["docstatus", "<", 2]],
+		or_filters=[
+			["tracking_no", "is", "not set"],
+			["posting_date", ">=", add_days(nowdate(), -lookback_days)],
+		]
+		if "tracking_no" in columns
+		else None,
+		fields=fields,
+		limit=0,
+	)
+
+	stats = {"notes": len(notes), "updated": 0, "missing": 0}
+	for start in range(0, len(notes), GRAPHQL_BATCH_SIZE):
+		batch = notes[start : start + GRAPHQL_BATCH_SIZE]
+		payloads = _fetch_tracking_payloads([note.get(FULLFILLMENT_ID_FIELD) for note in batch]) or {}
+		linked_orders = _get_linked_sales_orders_by_note([note.name for note in batch])
+
+		updates = {}
+		for note in batch:
+			fulfillment_id = str(note.get(FULLFILLMENT_ID_FIELD))
+			payload = payloads.get(fulfillment_id)
+			if not payload:
+				stats["missing"] += 1
+				continue
+
+			cache_tracking_payload(fulfillment_id, payload)
+			values = _changed_tracking_values(note, payload)
+			if not values:
+				continue
+
+			updates[note.name] = values
+			for so_name in linked_orders.get(note.name, ()):
+				_write_tracking_entry(so_name, note.name, payload)
+
+		if updates:
+			frappe.db.bulk_update("Delivery Note", updates, update_modified=False)
+		stats["updated"] += len(updates)
+		frappe.db.commit()
+
+	return stats
+
+
+def get_tracking_payload(fulfillment_id: str | int) -> dict | None:
+	"""Return tracking details for a fulfillment, served from Redis for ``shopify_tracking_cache_ttl`` seconds."""
+
+	key = _tracking_cache_key(fulfillment_id)
+	payload = frappe.cache.get_value(key)
+	if payload is None:
+		payload = _get_tracking_payload(fulfillment_id)
+		if payload:
+			cache_tracking_payload(fulfillment_id, payload)
+	return payload
+
+
+def cache_tracking_payload(fulfillment_id: str | int, payload: dict) -> None:
+	ttl = cint(frappe.conf.get("shopify_tracking_cache_ttl") or DEFAULT_TRACKING_CACHE_TTL)
+	frappe.cache.set_value(_tracking_cache_key(fulfillment_id), payload, expires_in_sec=ttl)
+
+
+def invalidate_tracking_cache(fulfillment_ids) -> None:
+	for fulfillment_id in fulfillment_ids or []:
+		if fulfillment_id:
+			frappe.cache.delete_value(_tracking_cache_key(fulfillment_id))
+
+
+def patch_fulfillment_webhooks() -> None:
+	"""Keep cached tracking fresh from webhooks.
+
+	``orders/fulfilled`` invalidates the fulfillments it carries before Delivery Notes are
+	created. Tracking numbers usually change later, so ``fulfillments/create`` and
+	``fulfillments/update`` are subscribed too and routed to :func:`handle_fulfillment_webhook`.
+	"""
+
+	from ecommerce_integrations.shopify import fulfillment
+	from ecommerce_integrations.shopify.constants import EVENT_MAPPER, WEBHOOK_EVENTS
+
+	for event in FULFILLMENT_WEBHOOK_EVENTS:
+		EVENT_MAPPER[event] = "ecom_custom.shopify.tracking.handle_fulfillment_webhook"
+		# ``WEBHOOK_EVENTS`` is the list registered with Shopify when the settings are saved.
+		if event not in WEBHOOK_EVENTS:
+			WEBHOOK_EVENTS.append(event)
+
+	prepare_delivery_note = fulfillment.prepare_delivery_note
+	if getattr(prepare_delivery_note, "_invalidates_tracking_cache", False):
+		return
+
+	@functools.wraps(prepare_delivery_note)
+	def wrapped(payload, *args, **kwargs):
+		fulfillments = (payload or {}).get("fulfillments") or []
+		invalidate_tracking_cache([row.get("id") for row in fulfillments if isinstance(row, dict)])
+		return prepare_delivery_note(payload, *args, **kwargs)
+
+	wrapped._invalidates_tracking_cache = True
+	fulfillment.prepare_delivery_note = wrapped
+
+
+def handle_fulfillment_webhook(payload: dict, request_id: str | None = None) -> None:
+	"""Drop the cached tracking of an updated fulfillment and refresh its Delivery Notes."""
+
+	frappe.set_user("Administrator")
+	frappe.flags.request_id = request_id
+
+	fulfillment_id = (payload or {}).get("id")
+	if not fulfillment_id:
+		create_shopify_log(status="Error", message="Fulfillment webhook without an id")
+		return
+
+	invalidate_tracking_cache([fulfillment_id])
+	notes = frappe.get_all(
+		"Delivery Note",
+		filters={FULLFILLMENT_ID_FIELD: str(fulfillment_id), "docstatus": ["<", 2]},
+		pluck="name",
+	)
+	try:
+		for note in notes:
+			update_delivery_note_tracking(note)
+	except Exception as exc:
+		create_shopify_log(status="Error", exception=exc, rollback=True)
+	else:
+		create_shopify_log(status="Success", message=f"Tracking refreshed on {len(notes)} Delivery Note(s)")
+
+
+def _tracking_cache_key(fulfillment_id: str | int) -> str:
+	return f"{TRACKING_CACHE_KEY}:{fulfillment_id}"
+
+
+@temp_shopify_session
+def _fetch_tracking_payloads(fulfillment_ids: list[str | int]) -> dict[str, dict]:
+	"""Load tracking details for up to ``GRAPHQL_BATCH_SIZE`` fulfillments in one GraphQL request."""
+
+	import shopify
+
+	ids = [
+		f"gid://shopify/Fulfillment/{fulfillment_id}" for fulfillment_id in fulfillment_ids if fulfillment_id
+	]
+	if not ids:
+		return {}
+
+	for _attempt in range(GRAPHQL_MAX_RETRIES):
+		response = json.loads(shopify.GraphQL().execute(FULFILLMENT_TRACKING_QUERY, variables={"ids": ids}))
+		wait = _graphql_throttle_wait(response)
+		if not wait:
+			break
+		time.sleep(wait)
+	else:
+		frappe.log_error(title="Shopify tracking refresh throttled", message=json.dumps(response))
+		return {}
+
+	payloads = {}
+	for node in (response.get("data") or {}).get("nodes") or []:
+		if not node or not node.get("legacyResourceId"):
+			continue
+
+		tracking_info = node.get("trackingInfo") or []
+		payloads[str(node["legacyResourceId"])] = {
+			"tracking_numbers": [row["number"] for row in tracking_info if row.get("number")],
+			"tracking_urls": [row["url"] for row in tracking_info if row.get("url")],
+			"tracking_company": next((row["company"] for row in tracking_info if row.get("company")), None),
+		}
+	return payloads
+
+
+def _graphql_throttle_wait(response: dict) -> float:
+	errors = response.get("errors") or []
+	if not any((error.get("extensions") or {}).get("code") == "THROTTLED" for error in errors):
+		return 0.0
+
+	cost = (response.get("extensions") or {}).get("cost") or {}
+	status = cost.get("throttleStatus") or {}
+	missing = flt(cost.get("requestedQueryCost")) - flt(status.get("currentlyAvailable"))
+	return max(missing / (flt(status.get("restoreRate")) or 50.0), 1.0)
+
+
 @temp_shopify_session
 def _get_tracking_payload(fulfillment_id: str | int) -> dict | None:
 	try:
-		fulfillment = Fulfillment.find(fulfillment_id)
+		fulfillment = RateLimiter().call(Fulfillment.find, fulfillment_id)
 	except Exception:  # pragma: no cover - depends on Shopify responses
 		frappe.log_error(
 			title="Shopify tracking fetch failed",
@@ -65,41 +321,122 @@ def _get_tracking_payload(fulfillment_id: str | int) -> dict | None:
 	}
 
 
-def _store_tracking_snapshot(doc, payload: dict) -> None:  # noqa: ANN001
-	tracking_numbers = payload.get("tracking_numbers") or []
-	tracking_urls = payload.get("tracking_urls") or []
+def _changed_tracking_values(doc, payload: dict) -> dict:
+	values = {}
+	_tracking_numbers = payload.get("tracking_numbers") or []
+	if _tracking_numbers:
+		values["tracking_no"] = ", ".join(_tracking_numbers)
 
-	entry = {
-		"delivery_note": doc.name,
-		"tracking_numbers": tracking_numbers,
-		"tracking_urls": tracking_urls,
-		"tracking_company": payload.get("tracking_company"),
-		"synced_on": now_datetime().isoformat(),
-	}
+	if payload.get("tracking_company"):
+		values["transporter_name"] = payload.get("tracking_company")
 
-	linked_sales_orders = _get_linked_sales_orders(doc)
-	for so_name in linked_sales_orders:
-		existing_raw = frappe.db.get_value("Sales Order", so_name, "shopify_tracking_info") or "[]"
-		try:
-			existing_entries = json.loads(existing_raw)
-		except json.JSONDecodeError:
-			existing_entries = []
-
-		# replace previous entry for the same Delivery Note
-		existing_entries = [row for row in existing_entries if row.get("delivery_note") != doc.name]
-		existing_entries.append(entry)
-
-		frappe.db.set_value(
-			"Sales Order",
-			so_name,
-			"shopify_tracking_info",
-			json.dumps(existing_entries, sort_keys=True),
-			update_modified=False,
-		)
+	if payload.get("tracking_urls"):
+		values["shopify_tracking_urls"] = "\n".join(payload["tracking_urls"])
+
+	columns = get_writable_columns("Delivery Note")
+	return {field: value for field, value in values.items() if field in columns and doc.get(field) != value}
+
+
+def _store_tracking_snapshot(doc, payload: dict) -> None:
+	for so_name in _get_linked_sales_orders(doc):
+		_write_tracking_entry(so_name, doc.name, payload)
+
+
+def _write_tracking_entry(so_name: str, delivery_note: str, payload: dict) -> None:
+	"""Upsert one tracking entry per tracking number of a Sales Order / Delivery Note pair.
+
+	Every number gets its own indexed row, so parcels after the first of a multi-parcel
+	fulfillment can be looked up too; numbers no longer on the fulfillment are removed.
+	"""
+
+	tracking_numbers = list(
+		dict.fromkeys(number for number in payload.get("tracking_numbers") or [] if number)
+	)
+	# A fulfillment without numbers still records its carrier and URLs, under an empty number.
+	entry_numbers = tracking_numbers or [""]
+
+	frappe.db.delete(
+		TRACKING_ENTRY_DOCTYPE,
+		{
+			"sales_order": so_name,
+			"delivery_note": delivery_note,
+			"tracking_number": ["not in", entry_numbers],
+		},
+	)
+
+	now = now_datetime()
+	rows = [
+		{
+			"name": frappe.generate_hash(length=10),
+			"creation": now,
+			"modified": now,
+			"owner": frappe.session.user,
+			"modified_by": frappe.session.user,
+			"sales_order": so_name,
+			"delivery_note": delivery_note,
+			"tracking_number": number,
+			"tracking_numbers": "\n".join(tracking_numbers),
+			"tracking_urls": "\n".join(payload.get("tracking_urls") or []),
+			"tracking_company": payload.get("tracking_company"),
+			"synced_on": now,
+		}
+		for number in entry_numbers
+	]
 
+	# Frappe supports MariaDB and Postgres. MariaDB has no ``excluded``/row-alias form and keeps
+	# ``values()`` (deprecated only in MySQL 8), so each backend gets its own upsert clause.
+	if frappe.db.db_type == "postgres":
+		quote = '"'
+		updates = ", ".join(f'"{column}" = excluded."{column}"' for column in TRACKING_ENTRY_UPSERT_FIELDS)
+		upsert = f'on conflict ("sales_order", "delivery_note", "tracking_number") do update set {updates}'
+	else:
+		quote = "`"
+		updates = ", ".join(f"`{column}` = values(`{column}`)" for column in TRACKING_ENTRY_UPSERT_FIELDS)
+		upsert = f"on duplicate key update {updates}"
 
-def _get_linked_sales_orders(doc) -> set[str]:  # noqa: ANN001
+	columns = ", ".join(f"{quote}{column}{quote}" for column in rows[0])
+	placeholders = ", ".join(f"({', '.join(['%s'] * len(rows[0]))})" for _row in rows)
+	frappe.db.sql(
+		f"insert into {quote}tab{TRACKING_ENTRY_DOCTYPE}{quote} ({columns}) values {placeholders} {upsert}",
+		[value for row in rows for value in row.values()],
+	)
+
+
+def find_sales_orders_by_tracking_number(tracking_number: str) -> list[str]:
+	"""Sales Orders shipped with ``tracking_number`` (indexed lookup, one entry per number)."""
+
+	return frappe.get_all(
+		TRACKING_ENTRY_DOCTYPE,
+		filters={"tracking_number": tracking_number},
+		pluck="sales_order",
+		distinct=True,
+	)
+
+
+def delete_tracking_entries(doc, method=None) -> None:
+	"""Hook for Sales Order / Delivery Note ``on_trash``: drop their tracking entries."""
+
+	field = "sales_order" if doc.doctype == "Sales Order" else "delivery_note"
+	frappe.db.delete(TRACKING_ENTRY_DOCTYPE, {field: doc.name})
+
+
+def _get_linked_sales_orders(doc) -> set[str]:
 	orders = {item.against_sales_order for item in doc.items if getattr(item, "against_sales_order", None)}
 	if doc.get("against_sales_order"):
 		orders.add(doc.get("against_sales_order"))
 	return {order for order in orders if order}
+
+
+def _get_linked_sales_orders_by_note(delivery_notes: list[str]) -> dict[str, set[str]]:
+	rows = frappe.get_all(
+		"Delivery Note Item",
+		filters={"parent": ["in", delivery_notes], "against_sales_order": ["is", "set"]},
+		fields=["parent", "against_sales_order"],
+		distinct=True,
+		limit=0,
+	)
+
+	linked: dict[str, set[str]] = {}
+	for row in rows:
+		linked.setdefault(row.parent, set()).add(row.against_sales_order)
+	return linked
@@ -0,0 +1,99 @@
+import json
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from ecom_custom.shopify import bulk_operations, order_overrides
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SHOP_TIMEZONE = "Europe/Rome"
+
+
+def _bulk_orders() -> list[dict]:
+	with open(FIXTURES / "bulk_orders.jsonl") as lines:
+		return list(bulk_operations.iter_orders_from_jsonl(lines, timezone=SHOP_TIMEZONE))
+
+
+def _rest_order() -> dict:
+	with open(FIXTURES / "rest_order.json") as payload:
+		return json.load(payload)
+
+
+class TestBulkOrderMapping(FrappeTestCase):
+	def test_orders_are_reassembled_from_child_lines(self):
+		orders = _bulk_orders()
+
+		self.assertEqual([order["id"] for order in orders], [5501234567890, 5501234567891])
+		self.assertEqual([len(order["line_items"]) for order in orders], [2, 1])
+		self.assertIsNone(orders[1]["customer"])
+		self.assertIsNone(orders[1]["fulfillment_status"])
+
+	def test_fingerprint_matches_the_rest_payload(self):
+		bulk, rest = _bulk_orders()[0], _rest_order()
+
+		for docstatus in (0, 1):
+			self.assertEqual(
+				order_overrides._payload_fingerprint(bulk, docstatus),
+				order_overrides._payload_fingerprint(rest, docstatus),
+			)
+
+	def test_address_snapshots_match_the_rest_payload(self):
+		bulk, rest = _bulk_orders()[0], _rest_order()
+
+		for prefix in ("shipping", "billing"):
+			key = f"{prefix}_address"
+			self.assertEqual(bulk[key], rest[key])
+			self.assertEqual(
+				order_overrides._address_snapshot(bulk[key], prefix=prefix, default_email=bulk["email"]),
+				order_overrides._address_snapshot(rest[key], prefix=prefix, default_email=rest["email"]),
+			)
+
+	def test_line_items_carry_the_rest_fields_used_by_order_creation(self):
+		bulk, rest = _bulk_orders()[0], _rest_order()
+
+		self.assertEqual(bulk["discount_codes"], rest["discount_codes"])
+		self.assertEqual(bulk["created_at"], rest["created_at"])
+		self.assertEqual(bulk["closed_at"], rest["closed_at"])
+		for bulk_item, rest_item in zip(bulk["line_items"], rest["line_items"], strict=True):
+			self.assertLessEqual(set(bulk_item), set(rest_item))
+			for key in bulk_item:
+				self.assertEqual(bulk_item[key], rest_item[key], key)
+		for bulk_line, rest_line in zip(bulk["shipping_lines"], rest["shipping_lines"], strict=True):
+			self.assertLessEqual(set(bulk_line), set(rest_line))
+			for key in bulk_line:
+				self.assertEqual(bulk_line[key], rest_line[key], key)
+
+
+class TestBulkOrderDownload(FrappeTestCase):
+	def setUp(self):
+		handler = partial(_QuietHandler, directory=str(FIXTURES))
+		self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		host, port = self.server.server_address[:2]
+		self.url = f"http://{host}:{port}/bulk_orders.jsonl"
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+
+	def test_bulk_export_is_streamed_into_rest_shaped_pages(self):
+		with (
+			patch.object(
+				bulk_operations, "start_bulk_orders_query", return_value="gid://shopify/BulkOperation/1"
+			),
+			patch.object(bulk_operations, "wait_for_bulk_operation", return_value=self.url),
+			patch.object(bulk_operations, "get_shop_timezone", return_value=SHOP_TIMEZONE),
+		):
+			pages = list(bulk_operations.iter_bulk_order_pages("2024-03-01", "2024-03-02", page_size=1))
+
+		self.assertEqual([len(page) for page in pages], [1, 1])
+		self.assertEqual([page[0] for page in pages], _bulk_orders())
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+	def log_message(self, *args) -> None:
+		pass
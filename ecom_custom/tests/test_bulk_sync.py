@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from ecom_custom.shopify import bulk_sync
+
+PAGE_ONE = [{"id": order_id} for order_id in (101, 102, 103, 104)]
+PAGE_TWO = [{"id": order_id} for order_id in (201, 202)]
+
+
+def _pages(from_time, to_time, fields=None, page_info=None):
+	pages = [(None, PAGE_ONE), ("cursor-2", PAGE_TWO)]
+	start = 1 if page_info == "cursor-2" else 0
+	yield from pages[start:]
+
+
+class TestBackfillResume(FrappeTestCase):
+	def setUp(self):
+		self.window = frappe.get_doc(
+			{
+				"doctype": bulk_sync.BACKFILL_DOCTYPE,
+				"backfill_id": frappe.generate_hash(length=10),
+				"window_from": "2024-01-01 00:00:00",
+				"window_to": "2024-01-07 23:59:59",
+				"status": "Running",
+			}
+		).insert(ignore_permissions=True)
+
+	def test_resume_inside_first_page_skips_finished_orders(self):
+		synced = []
+
+		def interrupted(order):
+			if order["id"] == 103:
+				raise KeyboardInterrupt
+			synced.append(order["id"])
+
+		with (
+			patch.object(bulk_sync.order_overrides, "iter_order_pages_with_cursor", _pages),
+			patch.object(bulk_sync.order_overrides, "prime_sales_order_names"),
+			patch.object(bulk_sync, "_sync_order", interrupted),
+		):
+			with self.assertRaises(KeyboardInterrupt):
+				bulk_sync._sync_window(self.window.name)
+
+		self.window.reload()
+		self.assertFalse(self.window.page_info)
+		self.assertEqual(self.window.last_order_id, "102")
+
+		resumed = []
+		with (
+			patch.object(bulk_sync.order_overrides, "iter_order_pages_with_cursor", _pages),
+			patch.object(bulk_sync.order_overrides, "prime_sales_order_names"),
+			patch.object(bulk_sync, "_sync_order", lambda order: resumed.append(order["id"])),
+		):
+			bulk_sync._sync_window(self.window.name)
+
+		self.assertEqual(synced, [101, 102])
+		self.assertEqual(resumed, [103, 104, 201, 202])
+		self.window.reload()
+		self.assertEqual(self.window.orders_synced, 6)
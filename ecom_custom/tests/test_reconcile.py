@@ -0,0 +1,80 @@
+import json
+import threading
+from datetime import timedelta
+from itertools import pairwise
+from unittest.mock import patch
+
+import frappe
+import shopify
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, get_datetime, getdate
+from pyactiveresource.connection import Connection, Response
+
+from ecom_custom.shopify import reconcile
+
+ORDERS_PER_DAY = 600
+DAYS = 3
+
+
+def _rows():
+	for day in range(DAYS):
+		for position in range(ORDERS_PER_DAY):
+			order_id = day * ORDERS_PER_DAY + position + 1
+			yield frappe._dict(
+				name=f"SO-{order_id:05d}",
+				shopify_order_id=str(order_id),
+				transaction_date=getdate(add_days("2024-01-01", day)),
+			)
+
+
+class TestReconcileWindows(FrappeTestCase):
+	def test_dense_consecutive_windows_fetch_each_range_once(self):
+		ranges = []
+
+		def fetch(start, end):
+			ranges.append((start, end))
+			for row in _rows():
+				if start <= get_datetime(row.transaction_date) <= end:
+					yield {"id": int(row.shopify_order_id)}
+
+		with (
+			patch.object(reconcile, "_iter_targets", lambda limit=None: _rows()),
+			patch.object(reconcile.order_overrides, "fetch_old_orders_any", fetch),
+			patch.object(reconcile.order_overrides, "_post_process_sales_order", return_value=True),
+			patch.object(reconcile, "_fetch_order_payload") as fetch_one,
+			patch.object(frappe.db, "commit"),
+		):
+			stats = reconcile.reconcile_sales_orders()
+
+		self.assertEqual(len(ranges), DAYS)
+		for (_start, end), (next_start, _end) in pairwise(ranges):
+			self.assertEqual(next_start - end, timedelta(seconds=1))
+		fetch_one.assert_not_called()
+		self.assertEqual(stats["total"], DAYS * ORDERS_PER_DAY)
+		self.assertEqual(stats["updated"], DAYS * ORDERS_PER_DAY)
+		self.assertFalse(stats["missing"])
+
+
+class TestFetchPayloadsById(FrappeTestCase):
+	def test_helper_threads_send_the_access_token(self):
+		requests = []
+
+		def open_(connection, method, path, headers=None, data=None):
+			requests.append((threading.get_ident(), connection.site, dict(headers or {})))
+			ids = path.partition("ids=")[2].partition("&")[0].replace("%2C", ",").split(",")
+			body = {"orders": [{"id": int(order_id)} for order_id in ids]}
+			return Response(200, json.dumps(body).encode(), {"Content-Type": "application/json"})
+
+		order_ids = list(range(1, reconcile.ORDERS_PER_ID_REQUEST * 2 + 1))
+		with patch.object(Connection, "_open", open_), patch.object(reconcile.RateLimiter, "acquire"):
+			with shopify.Session.temp("reconcile-test.myshopify.com", "2024-01", "shpat_test_token"):
+				# ``temp_shopify_session`` is a no-op in tests; the session above stands in for it.
+				shopify.ShopifyResource.site = "http://127.0.0.1:8080/admin/api/2024-01"
+				payloads = reconcile._fetch_payloads_by_id.__wrapped__(order_ids)
+
+		self.assertEqual(len(requests), 2)
+		self.assertNotIn(threading.get_ident(), {thread for thread, _site, _headers in requests})
+		for _thread, site, headers in requests:
+			self.assertEqual(site, "http://127.0.0.1:8080")
+			self.assertEqual(headers.get("X-Shopify-Access-Token"), "shpat_test_token")
+		self.assertEqual(sorted(payloads), sorted(str(order_id) for order_id in order_ids))